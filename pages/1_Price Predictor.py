@@ -1,15 +1,46 @@
 import streamlit as st
-import pickle
-import numpy as np
 import pandas as pd
+import os
+
+from src.models import forest, frozen, predict, prediction_cache, price_grid, schema
+from utils.artifacts import load_artifact, load_params, load_pickle, show_artifact_stats
 
 st.set_page_config(page_title="House Price Predictor")
 
-with open('models/df.pkl','rb') as file:
-    df = pickle.load(file)
+# Loaded once per server process, reloaded when DVC rewrites the files
+input_schema = load_artifact('models/input_schema.json', schema.load_input_schema)
+pipeline = load_pickle('models/real_estate_predictor.pkl')
+
+# Flattened forest and frozen preprocessor, much faster than sklearn for a
+# single row
+flat_forest = None
+if os.path.exists('models/forest.npz'):
+    flat_forest = load_artifact('models/forest.npz', forest.load_forest)
+preprocessor = None
+if os.path.exists('models/preprocessor.json'):
+    preprocessor = load_artifact('models/preprocessor.json', frozen.load_frozen_preprocessor)
+
+# Precomputed prices for the combinations seen in training, only used when
+# price_grid.enabled is set since they are interpolated
+grid = None
+if load_params('price_grid').get('enabled', False) and os.path.exists('models/price_grid.npz'):
+    grid = load_artifact('models/price_grid.npz', price_grid.load_price_grid)
+show_artifact_stats()
+
+# Shared by every session, emptied when the model file changes. Sized and
+# expired by the prediction_cache params, like serve.py
+cache_params = load_params('prediction_cache')
+cache = prediction_cache.get_cache(
+    'models/real_estate_predictor.pkl',
+    max_size=cache_params.get('max_size', 10000),
+    ttl_seconds=cache_params.get('ttl_seconds'),
+    area_bucket=cache_params.get('area_bucket'),
+)
+with st.sidebar.expander("Prediction cache"):
+    st.json(cache.stats())
 
-with open('models/real_estate_predictor.pkl','rb') as file:
-    pipeline = pickle.load(file)
+categories = {col: entry['categories'] for col, entry in input_schema['categorical'].items()}
+numeric = input_schema['numeric']
 
 st.title("🏘️ House Price Predictor")
 st.markdown("""---""")
@@ -21,24 +52,24 @@ col1, col2 = st.columns(2)
 
 with col1:
     # property_type
-    property_type = st.selectbox('Property Type', df['property_type'].unique().tolist())
+    property_type = st.selectbox('Property Type', categories['property_type'])
 with col2:
     # sector
-    sector = st.selectbox('Sector',sorted(df['sector'].unique().tolist()))
+    sector = st.selectbox('Sector',sorted(categories['sector']))
     
 
 col1, col2, col3 = st.columns(3)
 with col1:
-    bedrooms = float(st.selectbox('Number of Bedroom',sorted(df['bedRoom'].unique().tolist())))
+    bedrooms = float(st.selectbox('Number of Bedroom',numeric['bedRoom']['values']))
 with col2:
-    bathroom = float(st.selectbox('Number of Bathrooms',sorted(df['bathroom'].unique().tolist())))
+    bathroom = float(st.selectbox('Number of Bathrooms',numeric['bathroom']['values']))
 with col3:
-    balcony = st.selectbox('Balconies',sorted(df['balcony'].unique().tolist()))
+    balcony = st.selectbox('Balconies',sorted(categories['balcony']))
 
 col1, col2 = st.columns(2)
 
 with col1:
-    property_age = st.selectbox('Property Age',sorted(df['agePossession'].unique().tolist()))
+    property_age = st.selectbox('Property Age',sorted(categories['agePossession']))
     servant_room = st.selectbox('Servant Room',["No", "Yes"])
 with col2:
     built_up_area = float(st.number_input('Built Up Area', value=1250))
@@ -46,11 +77,11 @@ with col2:
 
 col1, col2, col3 = st.columns(3)
 with col1:
-    furnishing_type = st.selectbox('Furnishing Type',sorted(df['furnishing_type'].unique().tolist()))
+    furnishing_type = st.selectbox('Furnishing Type',sorted(categories['furnishing_type']))
 with col2:
-    luxury_category = st.selectbox('Luxury Category',sorted(df['luxury_category'].unique().tolist()))
+    luxury_category = st.selectbox('Luxury Category',sorted(categories['luxury_category']))
 with col3:
-    floor_category = st.selectbox('Floor Category',sorted(df['floor_category'].unique().tolist()))
+    floor_category = st.selectbox('Floor Category',sorted(categories['floor_category']))
 
 st.markdown("""---""")
 if st.button('Predict'):
@@ -59,26 +90,26 @@ if st.button('Predict'):
     store_room = 1.0 if store_room == "Yes" else 0.0
 
     data = [[property_type, sector, bedrooms, bathroom, balcony, property_age, built_up_area, servant_room, store_room, furnishing_type, luxury_category, floor_category]]
-    columns = ['property_type', 'sector', 'bedRoom', 'bathroom', 'balcony',
-               'agePossession', 'built_up_area', 'servant room', 'store room',
-               'furnishing_type', 'luxury_category', 'floor_category']
-    
+
     # Convert to DataFrame
-    one_df = pd.DataFrame(data, columns=columns)
-    # predict
-    base_price = np.expm1(pipeline.predict(one_df))[0]
-
-    def get_ci(price):
-        if price < 0.5:
-            return 0.05
-        elif price < 1:
-            return 0.12
-        else:
-            return 0.22
-    
-    ci = get_ci(base_price)
-    low = base_price - ci
-    high = base_price + ci
+    one_df = pd.DataFrame(data, columns=predict.FEATURE_COLUMNS)
+    # predict, from the grid when it covers these inputs
+    base_price = None
+    if grid is not None:
+        # Skipped when the model was retrained without rerunning price_grid
+        base_price = price_grid.lookup_price(
+            grid, one_df.iloc[0].to_dict(), cache.current_model_hash()
+        )
+    if base_price is not None:
+        ci = predict.get_ci(base_price)
+        low = base_price - ci
+        high = base_price + ci
+    else:
+        result = cache.predict(
+            one_df, lambda rows: predict.predict_prices(pipeline, rows, flat_forest, preprocessor)
+        ).iloc[0]
+        low = result['price_low']
+        high = result['price_high']
 
     # display
     st.write("### `The price is in between {} Cr and {} Cr`".format(round(low,2),round(high,2)))
@@ -1,18 +1,20 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import pickle
 import ast
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from utils.artifacts import load_csv, load_pickle, show_artifact_stats
+
 st.set_page_config(page_title="Plotting Demo")
 
 st.title('Analytics')
 
-new_df = pd.read_csv('models/data_viz1.csv')
-wordcloud_df = pickle.load(open('models/wordcloud_df.pkl','rb'))
+new_df = load_csv('models/data_viz1.csv')
+wordcloud_df = load_pickle('models/wordcloud_df.pkl')
+show_artifact_stats()
 
 def get_word_cloud(df, sector):
     if sector != "Overall":
@@ -1,40 +1,50 @@
 import streamlit as st
-import pickle
 import pandas as pd
 import numpy as np
+import os
 
-st.set_page_config(page_title="Recommend Appartments")
+from src.models.recommender import ann, artifacts, engine, radius
+from utils.artifacts import load_artifact, load_params, load_pickle, show_artifact_stats
 
-location_df = pickle.load(open('models/recommend/location_df.pkl','rb'))
+st.set_page_config(page_title="Recommend Appartments")
 
-cosine_sim1 = pickle.load(open('models/recommend/cosine_sim1.pkl','rb'))
-cosine_sim2 = pickle.load(open('models/recommend/cosine_sim2.pkl','rb'))
-cosine_sim3 = pickle.load(open('models/recommend/cosine_sim3.pkl','rb'))
+location_df = load_pickle('models/recommend/location_df.pkl')
 
-def recommend_properties_with_scores(property_name, top_n=5):
-    cosine_sim_matrix = 0.5 * cosine_sim1 + 0.8 * cosine_sim2 + 1 * cosine_sim3
-    # cosine_sim_matrix = cosine_sim3
+# The manifest is rewritten with every new set of similarity matrices
+similarities = load_artifact(
+    'models/recommend',
+    lambda path: artifacts.load_similarities(path, mmap_mode='r'),
+    watch=os.path.join('models/recommend', artifacts.MANIFEST),
+)
+cosine_sim1 = similarities['cosine_sim1']
+cosine_sim2 = similarities['cosine_sim2']
+cosine_sim3 = similarities['cosine_sim3']
 
-    # Get the similarity scores for the property using its name as the index
-    sim_scores = list(enumerate(cosine_sim_matrix[location_df.index.get_loc(property_name)]))
+radius_index = load_artifact('models/recommend/radius_index.npz', radius.load_radius_index)
 
-    # Sort properties based on the similarity scores
-    sorted_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+topk_index = load_artifact('models/recommend/topk_index.npz', engine.load_topk_index)
 
-    # Get the indices and scores of the top_n most similar properties
-    top_indices = [i[0] for i in sorted_scores[1:top_n + 1]]
-    top_scores = [i[1] for i in sorted_scores[1:top_n + 1]]
+recommender_params = load_params('recommender')
 
-    # Retrieve the names of the top properties using the indices
-    top_properties = location_df.index[top_indices].tolist()
+# Only built when recommender.ann.enabled is set or recommender.backend is ann
+ann_index = None
+if os.path.exists('models/recommend/ann_index.npz'):
+    ann_index = load_artifact('models/recommend/ann_index.npz', ann.load_ivf_index)
 
-    # Create a dataframe with the results
-    recommendations_df = pd.DataFrame({
-        'PropertyName': top_properties,
-        'SimilarityScore': top_scores
-    })
+show_artifact_stats()
 
-    return recommendations_df
+def recommend_properties_with_scores(property_name, top_n=5):
+    return engine.recommend(
+        [cosine_sim1, cosine_sim2, cosine_sim3],
+        location_df.index,
+        property_name,
+        top_n=top_n,
+        weights=engine.DEFAULT_WEIGHTS,
+        index=topk_index,
+        ann_index=ann_index,
+        n_probe=recommender_params.get('ann', {}).get('n_probe', 8),
+        backend=recommender_params.get('backend', 'exact'),
+    )
 
 st.title('Select Location and Radius')
 
@@ -42,10 +52,11 @@ col1, col2 = st.columns(2)
 with col1:
     selected_location = st.selectbox('Location',sorted(location_df.columns.to_list()))
 with col2:
-    radius = st.number_input('Radius in Kms', value=5)
+    radius_km = st.number_input('Radius in Kms', value=5)
 
 if st.button('Search'):
-    result_ser = location_df[location_df[selected_location] < radius*1000][selected_location].sort_values()
+    rows, distances = radius.within_radius(radius_index, selected_location, radius_km*1000)
+    result_ser = pd.Series(distances, index=location_df.index[rows])
     if len(result_ser.keys()) == 0:
         st.warning("No Apartments available")
     else:
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+import os
+import time
+import shutil
+import argparse
+import logging
+import tempfile
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="data_benchmark.log")
+
+# Every dataset handed from one DVC stage to the next, with how many
+# stages read it
+PIPELINE_DATASETS = [
+    ("interim", "flats", 1),
+    ("interim", "houses", 1),
+    ("interim", "gurgaon_properties", 2),
+    ("interim", "gurgaon_properties_cleaned_v1", 1),
+    ("interim", "gurgaon_properties_cleaned_v2", 1),
+    ("interim", "gurgaon_properties_outlier_treated", 1),
+    ("interim", "gurgaon_properties_missing_value_imputation", 2),
+    ("processed", "gurgaon_properties_post_feature_selection", 1),
+    ("processed", "train", 3),
+    ("processed", "test", 3),
+]
+
+
+def _time(fn, repeats: int) -> float:
+    # Best of `repeats` runs, in milliseconds
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def load_pipeline_datasets(logger: logging, scale: int = 1) -> dict:
+    # Whichever pipeline outputs exist, in any format, repeated `scale` times
+    frames = {}
+    for folder, stem, reads in PIPELINE_DATASETS:
+        for data_format in utils.DATA_FORMATS:
+            file_path = os.path.join("data", folder, utils.data_file(stem, data_format))
+            if os.path.exists(file_path):
+                df = utils.load_data(file_path, logger)
+                frames[stem] = (pd.concat([df] * scale, ignore_index=True), reads)
+                break
+    return frames
+
+
+def benchmark_io(
+    frames: dict, logger: logging, repeats: int = 3, n_columns: int = 3
+) -> pd.DataFrame:
+    # Write, full read and column subset read of every dataset in every
+    # format, plus the total over one pipeline run
+    results = []
+    # Keep the per-call load/save logging out of the timings
+    io_logger = logger.getChild("io")
+    io_logger.setLevel("WARNING")
+    tmp_dir = tempfile.mkdtemp(prefix="io_benchmark_")
+    try:
+        for stem, (df, reads) in frames.items():
+            columns = df.columns[:n_columns].tolist()
+            for data_format in utils.DATA_FORMATS:
+                file_name = utils.data_file(stem, data_format)
+                file_path = os.path.join(tmp_dir, file_name)
+                write_ms = _time(
+                    lambda: utils.save_data(df, tmp_dir, file_name, io_logger), repeats
+                )
+                read_ms = _time(lambda: utils.load_data(file_path, io_logger), repeats)
+                read_columns_ms = _time(
+                    lambda: utils.load_data(file_path, io_logger, columns=columns),
+                    repeats,
+                )
+                loaded = utils.load_data(file_path, io_logger)
+                results.append(
+                    {
+                        "dataset": stem,
+                        "format": data_format,
+                        "rows": len(df),
+                        "size_kib": os.path.getsize(file_path) / 1024,
+                        "write_ms": write_ms,
+                        "read_ms": read_ms,
+                        f"read_{n_columns}_columns_ms": read_columns_ms,
+                        "stage_io_ms": write_ms + reads * read_ms,
+                        "object_columns": int((loaded.dtypes == object).sum()),
+                    }
+                )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    results = pd.DataFrame(results)
+    totals = (
+        results.groupby("format", sort=False)[
+            ["size_kib", "write_ms", "read_ms", "stage_io_ms"]
+        ]
+        .sum()
+        .reset_index()
+        .assign(dataset="pipeline total")
+    )
+    return pd.concat([results, totals], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV vs Parquet pipeline I/O")
+    parser.add_argument(
+        "--scale", type=int, default=1, help="repeat every dataset N times"
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        frames = load_pipeline_datasets(logger, args.scale)
+        if not frames:
+            raise ValueError("No pipeline datasets found, run the DVC stages first")
+        logger.info("Benchmarking %d datasets", len(frames))
+        print(benchmark_io(frames, logger, args.repeats).to_string(index=False))
+
+    except Exception as e:
+        logger.error("Benchmark failed: %s", e)
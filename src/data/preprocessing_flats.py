@@ -4,6 +4,7 @@ import os
 import re
 
 import src.utils as utils
+from src.data import streaming
 
 # Logging configuration
 logger = utils.configure_logger(__name__, log_file="data_preprocessing.log")
@@ -202,33 +203,50 @@ def add_property_type(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def preprocess_flats(df: pd.DataFrame) -> pd.DataFrame:
+    # Pipeline
+    return (
+        df.pipe(drop_columns)
+        .pipe(rename_columns)
+        .pipe(clean_society)
+        .pipe(process_price)
+        .pipe(process_price_per_sqft)
+        .pipe(process_bedroom)
+        .pipe(convert_bathroom)
+        .pipe(process_balcony)
+        .pipe(handle_additional_room)
+        .pipe(process_floor_num)
+        .pipe(handle_facing)
+        .pipe(calculate_area)
+        .pipe(add_property_type)
+    )
+
+
 if __name__ == "__main__":
     try:
+        data_format = utils.get_data_format(logger)
+        params = utils.load_params("params.yaml", "preprocessing", logger)
         data_path = os.path.join("data", "raw")
         file_path = os.path.join(data_path, "flats.csv")
-        df = utils.load_data(file_path, logger)
-        if df.empty:
-            raise ValueError("Data loading failed: Empty DataFrame")
-
-        # Pipeline
-        df = (
-            df.pipe(drop_columns)
-            .pipe(rename_columns)
-            .pipe(clean_society)
-            .pipe(process_price)
-            .pipe(process_price_per_sqft)
-            .pipe(process_bedroom)
-            .pipe(convert_bathroom)
-            .pipe(process_balcony)
-            .pipe(handle_additional_room)
-            .pipe(process_floor_num)
-            .pipe(handle_facing)
-            .pipe(calculate_area)
-            .pipe(add_property_type)
-        )
-
         data_path = os.path.join("data", "interim")
-        utils.save_data(df, data_path, "flats.csv", logger=logger)
+        file_name = utils.data_file("flats", data_format)
+
+        if params.get("mode", "in_memory") == "streaming":
+            streaming.stream_file(
+                file_path,
+                os.path.join(data_path, file_name),
+                preprocess_flats,
+                params.get("chunk_size", 50000),
+                logger,
+            )
+        else:
+            df = utils.load_data(file_path, logger)
+            if df.empty:
+                raise ValueError("Data loading failed: Empty DataFrame")
+
+            df = preprocess_flats(df)
+
+            utils.save_data(df, data_path, file_name, logger=logger)
 
     except Exception as main_e:
         logger.error("Pipeline failed: %s", main_e)
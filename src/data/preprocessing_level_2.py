@@ -112,25 +112,33 @@ def process_sector(data: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def preprocess_level_2(df: pd.DataFrame) -> pd.DataFrame:
+    # Pipeline
+    df = df.pipe(process_sector)
+
+    # features to drop -> property_name, address, description, rating
+    return df.drop(columns=["property_name", "address", "description", "rating"])
+
+
 if __name__ == "__main__":
     try:
+        data_format = utils.get_data_format(logger)
         data_path = os.path.join("data", "interim")
-        file_path = os.path.join(data_path, "gurgaon_properties.csv")
+        file_path = os.path.join(
+            data_path, utils.data_file("gurgaon_properties", data_format)
+        )
         df = utils.load_data(file_path, logger)
         if df.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
 
-        # Pipeline
-        df = df.pipe(process_sector)
-
-        # features to drop -> property_name, address, description, rating
-        df.drop(
-            columns=["property_name", "address", "description", "rating"], inplace=True
-        )
+        df = preprocess_level_2(df)
 
         data_path = os.path.join("data", "interim")
         utils.save_data(
-            df, data_path, "gurgaon_properties_cleaned_v1.csv", logger=logger
+            df,
+            data_path,
+            utils.data_file("gurgaon_properties_cleaned_v1", data_format),
+            logger=logger,
         )
 
     except Exception as e:
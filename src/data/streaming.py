@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+import os
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import src.utils as utils
+
+
+def _common_dtype(left: np.dtype, right: np.dtype) -> np.dtype:
+    # What read_csv gives a column whose chunks were read as `left` and
+    # `right`: the wider number, text for anything else
+    if left == right:
+        return left
+    numeric = [
+        pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        for dtype in (left, right)
+    ]
+    if all(numeric):
+        return np.result_type(left, right)
+    return np.dtype(object)
+
+
+def scan_dtypes(file_path: str, chunk_size: int) -> dict:
+    # Column dtypes of the whole CSV file, from one pass over its chunks. A
+    # chunk read on its own can miss the text or the missing values that
+    # decide the dtype of a column
+    dtype = None
+    for chunk in utils.read_chunks(file_path, chunk_size):
+        chunk_dtype = chunk.dtypes.to_dict()
+        if dtype is None:
+            dtype = chunk_dtype
+        else:
+            dtype = {
+                column: _common_dtype(dtype[column], chunk_dtype[column])
+                for column in dtype
+            }
+    if dtype is None:
+        raise ValueError(f"Data loading failed: Empty file {file_path}")
+    return dtype
+
+
+def drop_seen(chunk: pd.DataFrame, seen: np.ndarray) -> tuple:
+    # drop_duplicates across chunks: rows are compared by their 64 bit hash,
+    # `seen` holds the sorted hashes of the rows kept so far
+    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    keep = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, seen)
+    return chunk[keep], np.union1d(seen, hashes[keep])
+
+
+def csv_to_parquet(csv_path: str, parquet_path: str, chunk_size: int) -> None:
+    # Chunk by chunk, with the dtypes utils.save_data writes for the whole
+    # frame. Text columns are strings even in chunks where they are all NaN
+    dtype = scan_dtypes(csv_path, chunk_size)
+    schema = pa.schema(
+        [
+            (column, pa.string() if kind == object else pa.from_numpy_dtype(kind))
+            for column, kind in dtype.items()
+        ]
+    )
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for chunk in utils.read_chunks(csv_path, chunk_size, dtype=dtype):
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            )
+
+
+def stream_file(
+    file_path: str,
+    output_path: str,
+    process,
+    chunk_size: int,
+    logger: logging,
+    deduplicate: bool = False,
+) -> int:
+    """Apply the row-local `process` to `file_path` chunk by chunk.
+
+    Chunks are read with the dtypes of the whole file and their results
+    appended to `output_path`, so the output matches
+    `process(load_data(file_path))` while memory is bounded by the chunk
+    size. `deduplicate` drops rows already seen in earlier chunks first, at
+    8 bytes per distinct row. A Parquet output is spooled through a CSV
+    file. Returns the number of rows written.
+    """
+    dtype = scan_dtypes(file_path, chunk_size)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Written aside and renamed, so a failed run leaves no partial output
+    spool = f"{output_path}.{os.getpid()}.partial.csv"
+    seen = np.empty(0, dtype=np.uint64)
+    columns, n_rows = None, 0
+    try:
+        for i, chunk in enumerate(
+            utils.read_chunks(file_path, chunk_size, dtype=dtype)
+        ):
+            if deduplicate:
+                chunk, seen = drop_seen(chunk, seen)
+            result = process(chunk)
+            # The step functions return an empty frame without columns on error
+            if result.columns.empty:
+                raise ValueError(f"Processing failed on chunk {i}")
+            if columns is None:
+                columns = list(result.columns)
+            elif list(result.columns) != columns:
+                raise ValueError(f"Chunk {i} has different columns than chunk 0")
+            result.to_csv(spool, mode="a", header=i == 0, index=False)
+            n_rows += len(result)
+            logger.debug(
+                "Chunk %d: %d rows in, %d rows out", i, len(chunk), len(result)
+            )
+
+        if utils.file_format(output_path) == "parquet":
+            csv_to_parquet(spool, output_path, chunk_size)
+            os.remove(spool)
+        else:
+            os.replace(spool, output_path)
+    finally:
+        if os.path.exists(spool):
+            os.remove(spool)
+
+    logger.info("Streamed %d rows to %s", n_rows, output_path)
+    return n_rows
@@ -246,6 +246,7 @@ def process_furnishDetails(data: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+@utils.memoize(paths=[os.path.join("data", "raw", "appartments.csv")], sources=[helper])
 def process_features(data: pd.DataFrame) -> pd.DataFrame:
     logger.debug("Processing features column")
     df = data.copy()
@@ -289,15 +290,7 @@ def process_features(data: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-if __name__ == "__main__":
-
-    data_path = os.path.join("data", "interim")
-    file_path = os.path.join(data_path, "gurgaon_properties_cleaned_v1.csv")
-
-    df = utils.load_data(file_path, logger)
-    if df.empty:
-        raise ValueError("Data loading failed: Empty DataFrame")
-
+def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     # Pipeline
     df = (
         df.pipe(process_areaWithType)
@@ -308,16 +301,35 @@ if __name__ == "__main__":
     )
 
     # cols to drop -> nearbyLocations,furnishDetails, features,features_list, additionalRoom
-    df.drop(
+    return df.drop(
         columns=[
             "nearbyLocations",
             "furnishDetails",
             "features",
             "features_list",
             "additionalRoom",
-        ],
-        inplace=True,
+        ]
     )
 
+
+if __name__ == "__main__":
+
+    data_format = utils.get_data_format(logger)
+    data_path = os.path.join("data", "interim")
+    file_path = os.path.join(
+        data_path, utils.data_file("gurgaon_properties_cleaned_v1", data_format)
+    )
+
+    df = utils.load_data(file_path, logger)
+    if df.empty:
+        raise ValueError("Data loading failed: Empty DataFrame")
+
+    df = engineer_features(df)
+
     data_path = os.path.join("data", "interim")
-    utils.save_data(df, data_path, "gurgaon_properties_cleaned_v2.csv", logger=logger)
+    utils.save_data(
+        df,
+        data_path,
+        utils.data_file("gurgaon_properties_cleaned_v2", data_format),
+        logger=logger,
+    )
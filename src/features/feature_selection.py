@@ -53,26 +53,32 @@ def add_categorized_columns(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def select_features(df: pd.DataFrame) -> pd.DataFrame:
+    # Pipeline
+    df = df.pipe(drop_unnecessary_columns).pipe(add_categorized_columns)
+
+    return df.drop(columns=["pooja room", "study room", "others"])
+
+
 if __name__ == "__main__":
     try:
+        data_format = utils.get_data_format(logger)
         data_path = os.path.join("data", "interim")
         file_path = os.path.join(
-            data_path, "gurgaon_properties_missing_value_imputation.csv"
+            data_path,
+            utils.data_file("gurgaon_properties_missing_value_imputation", data_format),
         )
         df = utils.load_data(file_path, logger)
         if df.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
 
-        # Pipeline
-        df = df.pipe(drop_unnecessary_columns).pipe(add_categorized_columns)
-
-        df = df.drop(columns=["pooja room", "study room", "others"])
+        df = select_features(df)
 
         data_path = os.path.join("data", "processed")
         utils.save_data(
             df,
             data_path,
-            "gurgaon_properties_post_feature_selection.csv",
+            utils.data_file("gurgaon_properties_post_feature_selection", data_format),
             logger=logger,
         )
 
@@ -78,7 +78,7 @@ def impute_builtUpArea(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def mode_based_imputation(row):
+def mode_based_imputation(row, df: pd.DataFrame):
     if row["agePossession"] == "Undefined":
         mode_value = df[
             (df["sector"] == row["sector"])
@@ -93,7 +93,7 @@ def mode_based_imputation(row):
         return row["agePossession"]
 
 
-def mode_based_imputation2(row):
+def mode_based_imputation2(row, df: pd.DataFrame):
     if row["agePossession"] == "Undefined":
         mode_value = df[(df["sector"] == row["sector"])]["agePossession"].mode()
         # If mode_value is empty (no mode found), return NaN, otherwise return the mode
@@ -105,7 +105,7 @@ def mode_based_imputation2(row):
         return row["agePossession"]
 
 
-def mode_based_imputation3(row):
+def mode_based_imputation3(row, df: pd.DataFrame):
     if row["agePossession"] == "Undefined":
         mode_value = df[(df["property_type"] == row["property_type"])][
             "agePossession"
@@ -122,9 +122,9 @@ def mode_based_imputation3(row):
 def impute_AgePossion(df: pd.DataFrame) -> pd.DataFrame:
     logger.debug("Imputing agePossession column")
     try:
-        df["agePossession"] = df.apply(mode_based_imputation, axis=1)
-        df["agePossession"] = df.apply(mode_based_imputation2, axis=1)
-        df["agePossession"] = df.apply(mode_based_imputation3, axis=1)
+        df["agePossession"] = df.apply(mode_based_imputation, axis=1, args=(df,))
+        df["agePossession"] = df.apply(mode_based_imputation2, axis=1, args=(df,))
+        df["agePossession"] = df.apply(mode_based_imputation3, axis=1, args=(df,))
         return df
     except Exception as e:
         logger.error(f"Error imputing agePossession: {e}")
@@ -142,27 +142,36 @@ def impute_floorNum(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def impute_missing_values(df: pd.DataFrame) -> pd.DataFrame:
+    # Pipeline
+    df = df.pipe(impute_builtUpArea).pipe(impute_AgePossion).pipe(impute_floorNum)
+
+    # Row 2536 is the position in the loaded file, not a label of the
+    # outlier treated frame
+    return df.drop(columns=["facing"]).drop(index=[2536])
+
+
 if __name__ == "__main__":
     try:
+        data_format = utils.get_data_format(logger)
         data_path = os.path.join("data", "interim")
-        file_path = os.path.join(data_path, "gurgaon_properties_outlier_treated.csv")
+        file_path = os.path.join(
+            data_path,
+            utils.data_file("gurgaon_properties_outlier_treated", data_format),
+        )
 
         df = utils.load_data(file_path, logger)
 
         if df.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
 
-        # Pipeline
-        df = df.pipe(impute_builtUpArea).pipe(impute_AgePossion).pipe(impute_floorNum)
-
-        df.drop(columns=["facing"], inplace=True)
-        df.drop(index=[2536], inplace=True)
+        df = impute_missing_values(df)
 
         data_path = os.path.join("data", "interim")
         utils.save_data(
             df,
             data_path,
-            "gurgaon_properties_missing_value_imputation.csv",
+            utils.data_file("gurgaon_properties_missing_value_imputation", data_format),
             logger=logger,
         )
 
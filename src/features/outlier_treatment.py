@@ -99,30 +99,42 @@ def reTreat_pricePerSqft(data: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def treat_outliers(df: pd.DataFrame) -> pd.DataFrame:
+    # Pipeline
+    df = (
+        df.drop_duplicates()
+        .pipe(treat_pricePerSqft)
+        .pipe(treat_area)
+        .pipe(treat_bedreoom)
+        .pipe(treat_carpetArea)
+        .pipe(reTreat_pricePerSqft)
+    )
+
+    df["area_room_ratio"] = df["area"] / df["bedRoom"]
+    return df
+
+
 if __name__ == "__main__":
     try:
+        data_format = utils.get_data_format(logger)
         data_path = os.path.join("data", "interim")
-        file_path = os.path.join(data_path, "gurgaon_properties_cleaned_v2.csv")
+        file_path = os.path.join(
+            data_path, utils.data_file("gurgaon_properties_cleaned_v2", data_format)
+        )
 
-        df = utils.load_data(file_path, logger).drop_duplicates()
+        df = utils.load_data(file_path, logger)
 
         if df.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
 
-        # Pipeline
-        df = (
-            df.pipe(treat_pricePerSqft)
-            .pipe(treat_area)
-            .pipe(treat_bedreoom)
-            .pipe(treat_carpetArea)
-            .pipe(reTreat_pricePerSqft)
-        )
-
-        df["area_room_ratio"] = df["area"] / df["bedRoom"]
+        df = treat_outliers(df)
 
         data_path = os.path.join("data", "interim")
         utils.save_data(
-            df, data_path, "gurgaon_properties_outlier_treated.csv", logger=logger
+            df,
+            data_path,
+            utils.data_file("gurgaon_properties_outlier_treated", data_format),
+            logger=logger,
         )
 
     except Exception as e:
@@ -9,29 +9,39 @@ import src.utils as utils
 logger = utils.configure_logger(__name__, log_file="splitting_data.log")
 
 
+def split_data(df: pd.DataFrame, params: dict) -> tuple:
+    # split data into train and test
+    return train_test_split(
+        df, test_size=params["test_size"], random_state=params["random_state"]
+    )
+
+
 if __name__ == "__main__":
     try:
         # loading params
         params = utils.load_params("params.yaml", "split_data", logger)
 
         # load data
+        data_format = utils.get_data_format(logger)
         data_path = os.path.join("data", "processed")
         file_path = os.path.join(
-            data_path, "gurgaon_properties_post_feature_selection.csv"
+            data_path,
+            utils.data_file("gurgaon_properties_post_feature_selection", data_format),
         )
         df = utils.load_data(file_path, logger)
         if df.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
 
-        # split data into train and test
-        train, test = train_test_split(
-            df, test_size=params["test_size"], random_state=params["random_state"]
-        )
+        train, test = split_data(df, params)
 
         # save train and test data
         data_path = os.path.join("data", "processed")
-        utils.save_data(train, data_path, "train.csv", logger=logger)
-        utils.save_data(test, data_path, "test.csv", logger=logger)
+        utils.save_data(
+            train, data_path, utils.data_file("train", data_format), logger=logger
+        )
+        utils.save_data(
+            test, data_path, utils.data_file("test", data_format), logger=logger
+        )
 
     except Exception as e:
         logger.error(f"Error loading data: {e}")
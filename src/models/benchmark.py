@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+import os
+import time
+import argparse
+import logging
+
+from src.models import forest, frozen, predict
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="model_benchmark.log")
+
+
+def _time(fn, repeats: int) -> float:
+    # Best of `repeats` runs, in milliseconds
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def benchmark_forest(
+    pipeline,
+    flat_forest: dict,
+    X: pd.DataFrame,
+    logger: logging,
+    batch_sizes=(1, 10, 100, 1000, 10000),
+    repeats: int = 5,
+) -> pd.DataFrame:
+    # Parity on the full frame, then sklearn vs flattened latency of the
+    # regressor alone for growing batches
+    features = pipeline[:-1].transform(X[predict.FEATURE_COLUMNS])
+    forest.check_parity(pipeline[-1], flat_forest, features, logger)
+
+    results = []
+    for batch_size in batch_sizes:
+        rows = np.resize(np.arange(len(features)), batch_size)
+        batch = features[rows]
+        sklearn_ms = _time(lambda: pipeline[-1].predict(batch), repeats)
+        flat_ms = _time(lambda: forest.predict_forest(flat_forest, batch), repeats)
+        results.append(
+            {
+                "batch": batch_size,
+                "sklearn_ms": sklearn_ms,
+                "flattened_ms": flat_ms,
+                "speedup": sklearn_ms / flat_ms,
+            }
+        )
+    return pd.DataFrame(results)
+
+
+def benchmark_preprocessor(
+    pipeline,
+    preprocessor: frozen.FrozenPreprocessor,
+    X: pd.DataFrame,
+    logger: logging,
+    batch_sizes=(1, 10, 100, 1000),
+    repeats: int = 5,
+) -> pd.DataFrame:
+    X = X[predict.FEATURE_COLUMNS]
+    frozen.check_parity(pipeline[0], preprocessor, X, logger)
+
+    record = X.iloc[0].to_dict()
+    results = [
+        {
+            "batch": "record",
+            "sklearn_ms": _time(lambda: pipeline[0].transform(X.iloc[:1]), repeats),
+            "frozen_ms": _time(lambda: preprocessor.transform_record(record), repeats),
+        }
+    ]
+    for batch_size in batch_sizes:
+        batch = X.iloc[np.resize(np.arange(len(X)), batch_size)]
+        results.append(
+            {
+                "batch": batch_size,
+                "sklearn_ms": _time(lambda: pipeline[0].transform(batch), repeats),
+                "frozen_ms": _time(lambda: preprocessor.transform(batch), repeats),
+            }
+        )
+
+    results = pd.DataFrame(results)
+    results["speedup"] = results["sklearn_ms"] / results["frozen_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price model benchmarks")
+    parser.add_argument("--suite", choices=["forest", "preprocessor"], default="forest")
+    parser.add_argument(
+        "--data",
+        default=os.path.join(
+            "data", "processed", utils.data_file("test", utils.get_data_format(logger))
+        ),
+    )
+    parser.add_argument(
+        "--model", default=os.path.join("models", "real_estate_predictor.pkl")
+    )
+    parser.add_argument("--forest", default=os.path.join("models", "forest.npz"))
+    parser.add_argument(
+        "--preprocessor", default=os.path.join("models", "preprocessor.json")
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        df = utils.load_data(args.data, logger)
+        if df.empty:
+            raise ValueError("Data loading failed: Empty DataFrame")
+
+        pipeline = predict.load_pipeline(args.model)
+        if args.suite == "preprocessor":
+            results = benchmark_preprocessor(
+                pipeline,
+                frozen.load_frozen_preprocessor(args.preprocessor),
+                df,
+                logger,
+                repeats=args.repeats,
+            )
+        else:
+            results = benchmark_forest(
+                pipeline,
+                forest.load_forest(args.forest),
+                df,
+                logger,
+                repeats=args.repeats,
+            )
+        print(results.to_string(index=False))
+
+    except Exception as e:
+        logger.error("Benchmark failed: %s", e)
@@ -0,0 +1,103 @@
+import numpy as np
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+
+import sklearn
+import category_encoders as ce
+
+from src.models.prediction_cache import file_hash
+
+# Fitted preprocessor and train/test design matrices, shared by
+# model_building and model_evaluation
+DESIGN_CACHE_DIR = os.path.join("data", "interim", "design_cache")
+DESIGN_ARRAYS = ("X_train", "y_train", "X_test", "y_test")
+# Written last, an entry without it is incomplete
+META_FILE = "meta.json"
+
+
+def preprocessor_config(preprocessor) -> str:
+    # Full, untruncated repr of the unfitted transformer plus the library
+    # versions, since either can change the encoded output
+    return "|".join(
+        [
+            preprocessor.__repr__(N_CHAR_MAX=1_000_000),
+            sklearn.__version__,
+            ce.__version__,
+        ]
+    )
+
+
+def cache_key(preprocessor, *parts) -> str:
+    # `parts` identify the data, e.g. file hashes or split settings
+    digest = hashlib.sha256(preprocessor_config(preprocessor).encode())
+    for part in parts:
+        digest.update(b"\x1f" + str(part).encode())
+    return digest.hexdigest()[:16]
+
+
+def design_key(preprocessor, train_path: str, test_path: str) -> str:
+    # Hashing the raw files avoids parsing them just to find the entry
+    return cache_key(preprocessor, file_hash(train_path), file_hash(test_path))
+
+
+def is_complete(entry_dir: str, names=()) -> bool:
+    return os.path.exists(os.path.join(entry_dir, META_FILE)) and all(
+        os.path.exists(os.path.join(entry_dir, f"{name}.npy")) for name in names
+    )
+
+
+def save_arrays(entry_dir: str, arrays: dict, logger: logging, meta=None) -> None:
+    logger.debug("Caching %s in %s", ", ".join(arrays), entry_dir)
+    os.makedirs(entry_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(entry_dir, f"{name}.npy"), np.asarray(array))
+    with open(os.path.join(entry_dir, META_FILE), "w") as f:
+        json.dump(
+            {
+                "shapes": {name: list(np.shape(a)) for name, a in arrays.items()},
+                **(meta or {}),
+            },
+            f,
+            indent=2,
+        )
+
+
+def touch(entry_dir: str) -> None:
+    # Marks the entry as recently used for prune()
+    os.utime(os.path.join(entry_dir, META_FILE))
+
+
+def load_arrays(entry_dir: str, names, mmap: bool = True) -> dict:
+    # Memory mapped, so workers and repeated runs share the page cache
+    return {
+        name: np.load(
+            os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r" if mmap else None
+        )
+        for name in names
+    }
+
+
+def prune(cache_dir: str, max_entries: int, logger: logging) -> None:
+    # Keep the most recently used entries only
+    if not max_entries or not os.path.isdir(cache_dir):
+        return
+    entries = [
+        os.path.join(cache_dir, name)
+        for name in os.listdir(cache_dir)
+        if os.path.isdir(os.path.join(cache_dir, name))
+    ]
+    entries.sort(
+        key=lambda entry: (
+            os.path.getmtime(os.path.join(entry, META_FILE))
+            if os.path.exists(os.path.join(entry, META_FILE))
+            else 0.0
+        ),
+        reverse=True,
+    )
+    for entry in entries[max_entries:]:
+        logger.debug("Removing cache entry %s", entry)
+        shutil.rmtree(entry, ignore_errors=True)
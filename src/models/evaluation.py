@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+import time
+
+
+def regression_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    error = y_pred - y_true
+    ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+    return {
+        "mae": float(np.mean(np.abs(error))),
+        "rmse": float(np.sqrt(np.mean(error**2))),
+        "mape": float(np.mean(np.abs(error) / y_true)),
+        "bias": float(np.mean(error)),
+        "r2": float(1 - np.sum(error**2) / ss_tot) if ss_tot else float("nan"),
+    }
+
+
+def price_bands(prices: np.ndarray, edges: list) -> pd.Series:
+    # Labels like "<0.5", "0.5-1" and ">=5" (price in Cr)
+    edges = sorted(edges)
+    labels = (
+        [f"<{edges[0]:g}"]
+        + [f"{low:g}-{high:g}" for low, high in zip(edges[:-1], edges[1:])]
+        + [f">={edges[-1]:g}"]
+    )
+    codes = np.searchsorted(edges, prices, side="right")
+    return pd.Series(np.array(labels, dtype=object)[codes], name="price_band")
+
+
+def segment_metrics(
+    segments: pd.DataFrame, y_true: np.ndarray, y_pred: np.ndarray
+) -> pd.DataFrame:
+    """MAE, RMSE, MAPE, bias and R² for every group of every segment column.
+
+    The per-row error terms are computed once and summed with a single
+    groupby over (segment, group), the metrics are then derived from the
+    sums.
+    """
+    error = y_pred - y_true
+    terms = pd.DataFrame(
+        {
+            "abs_error": np.abs(error),
+            "squared_error": error**2,
+            "pct_error": np.abs(error) / y_true,
+            "error": error,
+            "y": y_true,
+            "y2": y_true**2,
+        }
+    )
+    long = (
+        segments.reset_index(drop=True)
+        .astype(str)
+        .melt(var_name="segment", value_name="group", ignore_index=False)
+    )
+    sums = (
+        long.join(terms)
+        .groupby(["segment", "group"], sort=True)
+        .agg(
+            rows=("y", "size"),
+            **{column: (column, "sum") for column in terms.columns},
+        )
+    )
+
+    n = sums["rows"]
+    ss_tot = sums["y2"] - sums["y"] ** 2 / n
+    return pd.DataFrame(
+        {
+            "rows": n,
+            "mae": sums["abs_error"] / n,
+            "rmse": np.sqrt(sums["squared_error"] / n),
+            "mape": sums["pct_error"] / n,
+            "bias": sums["error"] / n,
+            # Undefined for groups with a single price
+            "r2": (1 - sums["squared_error"] / ss_tot).where(ss_tot > 1e-12),
+        }
+    ).reset_index()
+
+
+def bootstrap_ci(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    n_resamples: int = 1000,
+    confidence: float = 0.95,
+    batch_size: int = 200,
+    random_state: int = 42,
+) -> dict:
+    """Percentile bootstrap intervals of MAE, RMSE and R².
+
+    Resamples are drawn as a (batch, rows) index matrix and scored with
+    row-wise reductions, `batch_size` bounds the memory of one matrix.
+    """
+    rng = np.random.default_rng(random_state)
+    n = len(y_true)
+    scores = {"mae": [], "rmse": [], "r2": []}
+    for start in range(0, n_resamples, batch_size):
+        index = rng.integers(0, n, size=(min(batch_size, n_resamples - start), n))
+        true, pred = y_true[index], y_pred[index]
+        squared = np.sum((pred - true) ** 2, axis=1)
+        ss_tot = np.sum((true - true.mean(axis=1, keepdims=True)) ** 2, axis=1)
+        scores["mae"].append(np.mean(np.abs(pred - true), axis=1))
+        scores["rmse"].append(np.sqrt(squared / n))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores["r2"].append(1 - squared / ss_tot)
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for metric, batches in scores.items():
+        values = np.concatenate(batches)
+        low, high = np.nanpercentile(values, [tail, 100 - tail])
+        intervals[metric] = {
+            "low": float(low),
+            "high": float(high),
+            "std": float(np.nanstd(values)),
+        }
+    return intervals
+
+
+def latency_profile(
+    predict_fn, X: pd.DataFrame, batch_sizes: list, repeats: int = 5
+) -> pd.DataFrame:
+    # Wall time of predict_fn on batches of each size, after one warm-up
+    # call, rows are reused when X is smaller than the batch
+    profile = []
+    for batch_size in batch_sizes:
+        batch = X.iloc[np.arange(batch_size) % len(X)]
+        predict_fn(batch)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_fn(batch)
+            timings.append(time.perf_counter() - start)
+        median = float(np.median(timings))
+        profile.append(
+            {
+                "batch_size": batch_size,
+                "median_ms": median * 1e3,
+                "best_ms": min(timings) * 1e3,
+                "ms_per_row": median * 1e3 / batch_size,
+                "rows_per_second": batch_size / median,
+            }
+        )
+    return pd.DataFrame(profile)
@@ -0,0 +1,96 @@
+import numpy as np
+
+import logging
+
+
+def flatten_forest(model, logger: logging) -> dict:
+    # Concatenate the node arrays of every tree, with child indices shifted
+    # to point into the combined arrays
+    logger.debug("Flattening forest of %d trees", len(model.estimators_))
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+    feature, threshold, left, right, value, missing_left = [], [], [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves point back at themselves, so every row can take the same
+        # number of steps regardless of where its path ends
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        value.append(tree.value[:, 0, 0])
+        missing_left.append(tree.missing_go_to_left)
+
+    # children[2 * i] is the left child of node i and children[2 * i + 1]
+    # the right one, so each step is a single gather
+    children = np.stack([np.concatenate(left), np.concatenate(right)], axis=1).ravel()
+
+    return {
+        "roots": offsets[:-1].astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "children": children.astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+        "missing_left": np.concatenate(missing_left).astype(bool),
+        "max_depth": np.int32(max(tree.max_depth for tree in trees)),
+        "n_features": np.int32(model.n_features_in_),
+    }
+
+
+def save_forest(forest: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving flattened forest to %s", file_path)
+    np.savez(file_path, **forest)
+
+
+def load_forest(file_path: str) -> dict:
+    with np.load(file_path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def predict_forest(forest: dict, X, block_size: int = 2048) -> np.ndarray:
+    # sklearn compares float32 features against float64 thresholds, so the
+    # cast is needed for identical splits
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim != 2 or X.shape[1] != forest["n_features"]:
+        raise ValueError(
+            f"Expected {int(forest['n_features'])} features, got shape {X.shape}"
+        )
+
+    roots = forest["roots"]
+    feature, threshold = forest["feature"], forest["threshold"]
+    children, missing_left = forest["children"], forest["missing_left"]
+    n_features = X.shape[1]
+
+    prediction = np.empty(X.shape[0], dtype=np.float64)
+    for start in range(0, X.shape[0], block_size):
+        x = X[start : start + block_size]
+        has_missing = np.isnan(x).any()
+        flat_x = x.ravel()
+        row_offsets = (np.arange(x.shape[0], dtype=np.int32) * n_features)[:, None]
+
+        # One node per (row, tree), all trees stepped together
+        node = np.repeat(roots[None, :], x.shape[0], axis=0)
+        for _ in range(int(forest["max_depth"])):
+            values = flat_x.take(row_offsets + feature.take(node))
+            go_right = ~(values <= threshold.take(node))
+            if has_missing:
+                go_right &= ~(np.isnan(values) & missing_left.take(node))
+            node = children.take(2 * node + go_right)
+
+        prediction[start : start + x.shape[0]] = forest["value"].take(node).mean(axis=1)
+
+    return prediction
+
+
+def check_parity(model, forest: dict, X, logger: logging, atol: float = 1e-9) -> float:
+    # The flattened forest has to reproduce model.predict, up to the order
+    # the per-tree values are summed in
+    expected = model.predict(X)
+    diff = float(np.max(np.abs(predict_forest(forest, X) - expected), initial=0.0))
+    logger.debug("Flattened forest max abs difference: %.3g", diff)
+    if diff > atol:
+        raise ValueError(f"Flattened forest differs from the model by {diff:.3g}")
+    return diff
@@ -0,0 +1,258 @@
+import numpy as np
+import pandas as pd
+
+import json
+import logging
+
+from sklearn.preprocessing import StandardScaler, OrdinalEncoder, OneHotEncoder
+
+import category_encoders as ce
+
+# Frames up to this many rows are transformed record by record
+RECORD_ROWS = 128
+
+
+def _is_missing(value) -> bool:
+    return value is None or value != value
+
+
+def _tolist(values) -> list:
+    return [
+        None if _is_missing(value) else value for value in np.asarray(values).tolist()
+    ]
+
+
+def _freeze_step(name: str, transformer, columns: list) -> dict:
+    step = {"name": name, "columns": list(columns)}
+
+    if transformer == "passthrough":
+        step["kind"] = "passthrough"
+    elif isinstance(transformer, StandardScaler):
+        n = len(columns)
+        mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(n)
+        scale = transformer.scale_ if transformer.scale_ is not None else np.ones(n)
+        step.update(kind="scale", mean=mean.tolist(), scale=scale.tolist())
+    elif isinstance(transformer, OrdinalEncoder):
+        step.update(
+            kind="ordinal",
+            categories=[_tolist(categories) for categories in transformer.categories_],
+        )
+    elif isinstance(transformer, OneHotEncoder):
+        drop = transformer.drop_idx_
+        step.update(
+            kind="onehot",
+            categories=[_tolist(categories) for categories in transformer.categories_],
+            drop=[None] * len(columns) if drop is None else _tolist(drop),
+        )
+    elif isinstance(transformer, ce.TargetEncoder):
+        # category -> ordinal code -> encoded value, collapsed into one table.
+        # ce codes unknown categories as -1 and missing ones as -2.
+        step.update(kind="target", categories=[], values=[], missing=[], unknown=[])
+        for column in columns:
+            codes = next(
+                entry["mapping"]
+                for entry in transformer.ordinal_encoder.mapping
+                if entry["col"] == column
+            )
+            encoded = transformer.mapping[column]
+            known = codes[codes >= 0]
+            step["categories"].append(_tolist(known.index))
+            step["values"].append(_tolist(encoded.reindex(known.values)))
+            step["missing"].append(_tolist([encoded.get(-2, np.nan)])[0])
+            step["unknown"].append(_tolist([encoded.get(-1, np.nan)])[0])
+    else:
+        raise ValueError(f"Cannot freeze {type(transformer).__name__} in step {name!r}")
+
+    return step
+
+
+def freeze_preprocessor(preprocessor, logger: logging) -> dict:
+    # Plain lists and dicts describing a fitted ColumnTransformer, in the
+    # order of its output columns
+    logger.debug("Freezing %s", type(preprocessor).__name__)
+    input_columns = list(preprocessor.feature_names_in_)
+    steps = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or len(columns) == 0:
+            continue
+        if name == "remainder":
+            columns = [input_columns[i] for i in columns]
+        steps.append(_freeze_step(name, transformer, columns))
+
+    return {"input_columns": input_columns, "steps": steps}
+
+
+class FrozenPreprocessor:
+    """Fitted ColumnTransformer replayed with dict lookups and arithmetic.
+
+    Built from the output of freeze_preprocessor. `transform_record` turns
+    one record into the model's feature vector without creating any pandas
+    objects, `transform` does the same column-wise for a whole frame.
+    Unknown categories raise like the sklearn encoders do.
+    """
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.steps = []
+        for step in spec["steps"]:
+            compiled = dict(step)
+            if step["kind"] in ("ordinal", "onehot"):
+                compiled["lookup"] = [
+                    {category: i for i, category in enumerate(categories)}
+                    for categories in step["categories"]
+                ]
+            if step["kind"] == "onehot":
+                compiled["width"] = [
+                    len(categories) - (drop is not None)
+                    for categories, drop in zip(step["categories"], step["drop"])
+                ]
+            if step["kind"] == "target":
+                compiled["lookup"] = [
+                    dict(zip(categories, values))
+                    for categories, values in zip(step["categories"], step["values"])
+                ]
+            self.steps.append(compiled)
+
+        self.n_features = sum(
+            sum(step["width"]) if step["kind"] == "onehot" else len(step["columns"])
+            for step in self.steps
+        )
+
+    @staticmethod
+    def _float(value) -> float:
+        return np.nan if value is None else float(value)
+
+    @staticmethod
+    def _unknown(column, value):
+        return ValueError(f"Found unknown category {value!r} in column {column!r}")
+
+    def transform_record(self, record: dict) -> np.ndarray:
+        out = []
+        for step in self.steps:
+            kind, columns = step["kind"], step["columns"]
+            if kind == "scale":
+                for column, mean, scale in zip(columns, step["mean"], step["scale"]):
+                    out.append((self._float(record[column]) - mean) / scale)
+            elif kind == "passthrough":
+                out.extend(self._float(record[column]) for column in columns)
+            elif kind == "ordinal":
+                for column, lookup in zip(columns, step["lookup"]):
+                    value = record[column]
+                    if value not in lookup:
+                        raise self._unknown(column, value)
+                    out.append(float(lookup[value]))
+            elif kind == "onehot":
+                for column, lookup, drop, width in zip(
+                    columns, step["lookup"], step["drop"], step["width"]
+                ):
+                    value = record[column]
+                    if value not in lookup:
+                        raise self._unknown(column, value)
+                    position = lookup[value]
+                    indicator = [0.0] * width
+                    if position != drop:
+                        # Categories after the dropped one shift left by one
+                        shift = drop is not None and position > drop
+                        indicator[position - shift] = 1.0
+                    out.extend(indicator)
+            else:
+                for column, lookup, missing, unknown in zip(
+                    columns, step["lookup"], step["missing"], step["unknown"]
+                ):
+                    value = record[column]
+                    if _is_missing(value):
+                        encoded = missing
+                    else:
+                        encoded = lookup.get(value, unknown)
+                    out.append(self._float(encoded))
+        return np.array(out, dtype=np.float64)
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        # Column-wise pandas lookups only pay off once the fixed per-column
+        # cost is spread over enough rows
+        if len(df) <= RECORD_ROWS:
+            records = df.to_dict("records")
+            if not records:
+                return np.empty((0, self.n_features), dtype=np.float64)
+            return np.vstack([self.transform_record(record) for record in records])
+
+        blocks = []
+        for step in self.steps:
+            kind, columns = step["kind"], step["columns"]
+            if kind == "scale":
+                values = df[columns].to_numpy(dtype=np.float64)
+                blocks.append(
+                    (values - np.array(step["mean"])) / np.array(step["scale"])
+                )
+            elif kind == "passthrough":
+                blocks.append(df[columns].to_numpy(dtype=np.float64))
+            elif kind == "ordinal":
+                for column, lookup in zip(columns, step["lookup"]):
+                    codes = self._codes(df[column], lookup)
+                    blocks.append(codes[:, None].astype(np.float64))
+            elif kind == "onehot":
+                for column, lookup, drop, width in zip(
+                    columns, step["lookup"], step["drop"], step["width"]
+                ):
+                    codes = self._codes(df[column], lookup)
+                    indicator = np.eye(len(lookup), dtype=np.float64)[codes]
+                    if drop is not None:
+                        indicator = np.delete(indicator, drop, axis=1)
+                    blocks.append(indicator)
+            else:
+                for column, lookup, missing, unknown in zip(
+                    columns, step["lookup"], step["missing"], step["unknown"]
+                ):
+                    series = df[column]
+                    encoded = series.map(lookup).astype(np.float64)
+                    encoded[series.isna()] = self._float(missing)
+                    encoded[series.notna() & ~series.isin(list(lookup))] = self._float(
+                        unknown
+                    )
+                    blocks.append(encoded.to_numpy()[:, None])
+        return np.hstack(blocks)
+
+    def _codes(self, series: pd.Series, lookup: dict) -> np.ndarray:
+        codes = series.map(lookup)
+        unknown = codes.isna()
+        if unknown.any():
+            raise self._unknown(series.name, series[unknown].iloc[0])
+        return codes.to_numpy(dtype=np.int64)
+
+
+def save_frozen_preprocessor(spec: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving frozen preprocessor to %s", file_path)
+    with open(file_path, "w") as f:
+        json.dump(spec, f, indent=2)
+
+
+def load_frozen_preprocessor(file_path: str) -> FrozenPreprocessor:
+    with open(file_path, "r") as f:
+        return FrozenPreprocessor(json.load(f))
+
+
+def check_parity(
+    preprocessor, frozen: FrozenPreprocessor, X: pd.DataFrame, logger: logging
+) -> None:
+    # The frozen copy has to reproduce the sklearn output exactly, for the
+    # whole frame and for single records
+    expected = preprocessor.transform(X).astype(np.float64)
+    record_rows = X.sample(min(len(X), 200), random_state=0)
+    checks = {
+        "frame": (frozen.transform(X), expected),
+        "records": (
+            np.vstack(
+                [
+                    frozen.transform_record(record)
+                    for record in record_rows.to_dict("records")
+                ]
+            ),
+            expected[X.index.get_indexer(record_rows.index)],
+        ),
+    }
+    for name, (result, reference) in checks.items():
+        if result.shape != reference.shape or not np.array_equal(
+            result, reference, equal_nan=True
+        ):
+            raise ValueError(f"Frozen preprocessor differs from sklearn ({name})")
+    logger.debug("Frozen preprocessor matches sklearn on %d rows", len(X))
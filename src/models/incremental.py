@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+
+import logging
+
+from scipy.special import expit
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OrdinalEncoder, OneHotEncoder
+
+import category_encoders as ce
+
+from src.models.schema import SchemaAccumulator
+
+import src.utils as utils
+
+MiB = 1 << 20
+# Rows read to estimate the in-memory size of a row
+SAMPLE_ROWS = 1000
+# Transforms and the forest fit make temporary copies of a chunk
+HEADROOM = 2.0
+# Per-row bookkeeping of a tree fit: bootstrap weights, sample indices,
+# targets and the sorted feature buffer
+FIT_ROW_BYTES = 40
+
+
+def row_bytes(file_path: str, n_features: int = 0) -> float:
+    # Size of one raw row as a pandas frame, plus its encoded float64 row and
+    # the float32 copy the forest fits on
+    sample = next(utils.read_chunks(file_path, SAMPLE_ROWS))
+    raw = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    design = n_features * (8 + 4) + FIT_ROW_BYTES if n_features else 0
+    return HEADROOM * (raw + design)
+
+
+def plan_chunk_rows(
+    file_path: str, memory_limit_mb: float, logger: logging, n_features: int = 0
+) -> int:
+    rows = max(1, int(memory_limit_mb * MiB / row_bytes(file_path, n_features)))
+    logger.debug("Chunks of %d rows fit in %s MiB", rows, memory_limit_mb)
+    return rows
+
+
+def read_chunks(file_path: str, chunk_rows: int, dtype: dict = None):
+    # Features and log target of every chunk of the training data
+    for chunk in utils.read_chunks(file_path, chunk_rows, dtype=dtype):
+        yield chunk.drop(columns=["price"]), np.log1p(chunk["price"])
+
+
+class _TargetStats:
+    # Count and target sum per category, all ce.TargetEncoder needs
+    def __init__(self, columns: list):
+        self.columns = columns
+        self.count = {column: {} for column in columns}
+        self.total = {column: {} for column in columns}
+        self.n = 0
+        self.y_sum = 0.0
+
+    def update(self, X: pd.DataFrame, y: pd.Series) -> None:
+        self.n += len(y)
+        self.y_sum += float(y.sum())
+        for column in self.columns:
+            grouped = y.groupby(X[column].to_numpy()).agg(["count", "sum"])
+            for value, count, total in grouped.itertuples():
+                self.count[column][value] = self.count[column].get(value, 0) + count
+                self.total[column][value] = self.total[column].get(value, 0.0) + total
+
+    def apply(self, encoder: ce.TargetEncoder) -> None:
+        # Same smoothing as TargetEncoder.fit_target_encoding, from the totals
+        prior = self.y_sum / self.n
+        encoder._mean = prior
+        for entry in encoder.ordinal_encoder.mapping:
+            column = entry["col"]
+            mapping = encoder.mapping[column].copy()
+            for value, code in entry["mapping"].items():
+                if code < 0:
+                    continue
+                count = self.count[column][value]
+                mean = self.total[column][value] / count
+                smoove = expit((count - encoder.min_samples_leaf) / encoder.smoothing)
+                mapping.loc[code] = prior * (1 - smoove) + mean * smoove
+            encoder.mapping[column] = mapping
+
+
+def _prototype(
+    accumulator: SchemaAccumulator, encoded: list, sample: pd.DataFrame
+) -> pd.DataFrame:
+    # Small frame holding every category of the encoded columns in order of
+    # first appearance, so the encoders fitted on it know the full vocabulary
+    n = max([len(accumulator.counts[column]) for column in encoded] + [1])
+    columns = {}
+    for column in accumulator.columns:
+        if column in encoded:
+            values = pd.Series(list(accumulator.counts[column]))
+        else:
+            values = sample[column].reset_index(drop=True)
+        columns[column] = values.iloc[np.arange(n) % len(values)].to_numpy()
+    return pd.DataFrame(columns)
+
+
+def fit_preprocessor(
+    preprocessor, file_path: str, chunk_rows: int, logger: logging
+) -> tuple:
+    """Fit a ColumnTransformer in one pass over the chunks of `file_path`.
+
+    Scalers are fitted with partial_fit, ordinal/one-hot encoders get the
+    sorted union of categories and target encoders the per-category target
+    sums, so the result matches an in-memory fit up to float rounding.
+    Returns the fitted preprocessor, the input schema, the row count, the
+    column dtypes to read the chunks with and the first chunk.
+    """
+    steps = []
+    for name, transformer, columns in preprocessor.transformers:
+        if not isinstance(
+            transformer,
+            (StandardScaler, OrdinalEncoder, OneHotEncoder, ce.TargetEncoder),
+        ):
+            raise ValueError(
+                f"Cannot fit {type(transformer).__name__} in step {name!r} by chunks"
+            )
+        steps.append((name, transformer, list(columns)))
+    target_columns = [
+        column
+        for _, transformer, columns in steps
+        if isinstance(transformer, ce.TargetEncoder)
+        for column in columns
+    ]
+    encoded = [
+        column
+        for _, transformer, columns in steps
+        if not isinstance(transformer, StandardScaler)
+        for column in columns
+    ]
+
+    # A CSV column read as text from the whole file can come out numeric in
+    # chunks that lack the non-numeric values, those are re-read as text
+    dtype = {}
+    while True:
+        scalers = {
+            name: StandardScaler(
+                with_mean=transformer.with_mean, with_std=transformer.with_std
+            )
+            for name, transformer, _ in steps
+            if isinstance(transformer, StandardScaler)
+        }
+        target_stats = _TargetStats(target_columns)
+        accumulator = SchemaAccumulator()
+        first, n_rows = None, 0
+        for i, (X, y) in enumerate(read_chunks(file_path, chunk_rows, dtype)):
+            logger.debug("Statistics pass, chunk %d (%d rows)", i, len(X))
+            if first is None:
+                first = X
+            n_rows += len(X)
+            accumulator.update(X)
+            target_stats.update(X, y)
+            for name, _, columns in steps:
+                if name in scalers:
+                    scalers[name].partial_fit(X[columns])
+        if first is None:
+            raise ValueError("Data loading failed: Empty DataFrame")
+
+        mixed = accumulator.mixed_columns()
+        if not mixed:
+            break
+        logger.info("Re-reading %s as text", ", ".join(mixed))
+        dtype.update({column: str for column in mixed})
+
+    input_schema = accumulator.result()
+    # Fitted in memory, the encoders also have NaN as their last category
+    categories = {
+        column: sorted(accumulator.counts[column])
+        + ([np.nan] if column in accumulator.missing else [])
+        for column in encoded
+    }
+    preprocessor = preprocessor.set_params(
+        **{
+            f"{name}__categories": [categories[column] for column in columns]
+            for name, transformer, columns in steps
+            if isinstance(transformer, (OrdinalEncoder, OneHotEncoder))
+        }
+    )
+    prototype = _prototype(accumulator, encoded, first)
+    preprocessor.fit(prototype, np.zeros(len(prototype)))
+
+    # Swap the statistics of the prototype fit for the streamed ones
+    for name, transformer, _ in preprocessor.transformers_:
+        if name in scalers:
+            for attribute in ("mean_", "var_", "scale_", "n_samples_seen_"):
+                setattr(transformer, attribute, getattr(scalers[name], attribute))
+        elif isinstance(transformer, ce.TargetEncoder):
+            target_stats.apply(transformer)
+
+    logger.info("Fitted the preprocessor on %d rows", n_rows)
+    return preprocessor, input_schema, n_rows, dtype, first
+
+
+def allocate_trees(chunk_sizes: list, n_estimators: int) -> list:
+    # Trees per chunk in proportion to its rows, largest remainders first,
+    # at least one per chunk
+    sizes = np.asarray(chunk_sizes, dtype=np.float64)
+    if len(sizes) > n_estimators:
+        raise ValueError(
+            f"{len(sizes)} chunks need at least as many trees, got {n_estimators}, "
+            "raise memory_limit_mb or n_estimators"
+        )
+    share = (n_estimators - len(sizes)) * sizes / sizes.sum()
+    trees = 1 + np.floor(share).astype(int)
+    remainder = n_estimators - trees.sum()
+    trees[np.argsort(-(share - np.floor(share)), kind="stable")[:remainder]] += 1
+    return trees.tolist()
+
+
+def fit_forest(
+    model,
+    preprocessor,
+    file_path: str,
+    chunk_rows: int,
+    n_rows: int,
+    logger: logging,
+    dtype: dict = None,
+):
+    """Grow `model` with warm_start, one shard of trees per chunk.
+
+    Each shard is fitted on its own chunk only, so peak memory is one
+    encoded chunk plus the trees built so far.
+    """
+    n_chunks = -(-n_rows // chunk_rows)
+    sizes = [min(chunk_rows, n_rows - i * chunk_rows) for i in range(n_chunks)]
+    trees = allocate_trees(sizes, model.n_estimators)
+
+    model.set_params(warm_start=True, n_estimators=0)
+    for i, ((X, y), shard) in enumerate(
+        zip(read_chunks(file_path, chunk_rows, dtype), trees)
+    ):
+        logger.debug("Fitting %d trees on chunk %d (%d rows)", shard, i, len(X))
+        model.set_params(n_estimators=model.n_estimators + shard)
+        model.fit(preprocessor.transform(X), y.to_numpy())
+    model.set_params(warm_start=False)
+
+    logger.info(
+        "Fitted %d trees on %d chunks, %d nodes in total",
+        len(model.estimators_),
+        n_chunks,
+        sum(estimator.tree_.node_count for estimator in model.estimators_),
+    )
+    return model
+
+
+def fit_chunked(
+    preprocessor, model, file_path: str, memory_limit_mb: float, logger: logging
+) -> tuple:
+    """Train the price pipeline without loading `file_path` at once.
+
+    Chunk sizes are chosen so a chunk, its encoded matrix and the forest's
+    working copies stay under `memory_limit_mb`. The fitted trees
+    themselves are not counted. Returns the pipeline, the input schema and
+    the first chunk for the parity checks.
+    """
+    chunk_rows = plan_chunk_rows(file_path, memory_limit_mb, logger)
+    preprocessor, input_schema, n_rows, dtype, first = fit_preprocessor(
+        preprocessor, file_path, chunk_rows, logger
+    )
+
+    n_features = preprocessor.transform(first.iloc[:1]).shape[1]
+    chunk_rows = plan_chunk_rows(file_path, memory_limit_mb, logger, n_features)
+    model = fit_forest(
+        model, preprocessor, file_path, chunk_rows, n_rows, logger, dtype
+    )
+
+    pipeline = Pipeline([("preprocessor", preprocessor), ("regressor", model)])
+    return pipeline, input_schema, first
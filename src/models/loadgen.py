@@ -0,0 +1,122 @@
+import numpy as np
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+
+from src.models import predict
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="loadgen.log")
+
+
+async def _post(reader, writer, host: str, body: bytes) -> int:
+    writer.write(
+        (
+            "POST /predict HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode()
+        + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, bodies, n_requests, latencies, errors):
+    # One keep-alive connection sending requests back to back
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(n_requests):
+            start = time.perf_counter()
+            status = await _post(reader, writer, host, bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(
+    host: str, port: int, rows: list, concurrency: int, n_requests: int
+) -> dict:
+    bodies = [json.dumps(row).encode() for row in rows]
+    latencies, errors = [], []
+    per_client = max(1, n_requests // concurrency)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(host, port, bodies[i:] + bodies[:i], per_client, latencies, errors)
+            for i in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "qps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def sample_rows(file_path: str, n_rows: int, logger: logging) -> list:
+    df = utils.load_data(file_path, logger)
+    if df.empty:
+        raise ValueError("Data loading failed: Empty DataFrame")
+    df = df[predict.FEATURE_COLUMNS].sample(min(n_rows, len(df)), random_state=0)
+    return df.to_dict("records")
+
+
+if __name__ == "__main__":
+    params = utils.load_params("params.yaml", "serve", logger)
+
+    parser = argparse.ArgumentParser(description="Load generator for src.models.serve")
+    parser.add_argument("--host", default=params.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=params.get("port", 8000))
+    parser.add_argument(
+        "--data",
+        default=os.path.join(
+            "data", "processed", utils.data_file("test", utils.get_data_format(logger))
+        ),
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    try:
+        rows = sample_rows(args.data, 1000, logger)
+        for concurrency in args.concurrency:
+            report = asyncio.run(
+                run_load(args.host, args.port, rows, concurrency, args.requests)
+            )
+            logger.info(
+                "concurrency=%(concurrency)d requests=%(requests)d "
+                "errors=%(errors)d qps=%(qps).1f p50=%(p50_ms).2fms "
+                "p99=%(p99_ms).2fms",
+                report,
+            )
+
+    except Exception as e:
+        logger.error(f"Error : {e}")
@@ -2,6 +2,8 @@ import numpy as np
 import pandas as pd
 
 import os
+import shutil
+import logging
 
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -13,88 +15,226 @@ import category_encoders as ce
 import pickle
 
 import src.utils as utils
+from src.models import design_cache, forest, frozen, incremental, schema
 
 # Logging configuration
 logger = utils.configure_logger(__name__, log_file="model_building.log")
 
+NUMERIC_COLUMNS = ["bedRoom", "bathroom", "built_up_area", "servant room", "store room"]
+COLUMNS_TO_ENCODE = [
+    "property_type",
+    "sector",
+    "balcony",
+    "agePossession",
+    "furnishing_type",
+    "luxury_category",
+    "floor_category",
+]
+
+
+def build_preprocessor() -> ColumnTransformer:
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUMERIC_COLUMNS),
+            ("cat", OrdinalEncoder(), COLUMNS_TO_ENCODE),
+            (
+                "cat1",
+                OneHotEncoder(drop="first", sparse_output=False),
+                ["agePossession"],
+            ),
+            ("target_enc", ce.TargetEncoder(handle_unknown="ignore"), ["sector"]),
+        ],
+        remainder="passthrough",
+    )
+
+
+def build_model(params: dict, **kwargs) -> RandomForestRegressor:
+    return RandomForestRegressor(
+        n_estimators=params["n_estimators"],
+        max_depth=params["max_depth"],
+        max_samples=params["max_samples"],
+        max_features=params["max_features"],
+        **kwargs,
+    )
+
+
+def export_preprocessor(
+    preprocessor, X: pd.DataFrame, input_schema: dict, output_dir: str, logger: logging
+) -> None:
+    # Dict/array copy of the fitted preprocessor for single-row inference,
+    # the pipeline stays the reference it is checked against
+    logger.info("Exporting frozen preprocessor")
+    frozen_spec = frozen.freeze_preprocessor(preprocessor, logger)
+    frozen.check_parity(preprocessor, frozen.FrozenPreprocessor(frozen_spec), X, logger)
+    frozen.save_frozen_preprocessor(
+        frozen_spec, os.path.join(output_dir, "preprocessor.json"), logger
+    )
+
+    # The predictor page only needs the allowed inputs, not the training X
+    logger.info("Saving input schema")
+    schema.save_input_schema(
+        input_schema, os.path.join(output_dir, "input_schema.json"), logger
+    )
+
+
+def prepare_design(
+    train_path: str, test_path: str, cache_dir: str, logger: logging
+) -> str:
+    """Cache entry holding the fitted preprocessor and the encoded train/test
+    matrices for these files and this preprocessor configuration.
+
+    The files are only parsed when no complete entry exists, so changes to
+    the regressor alone go straight to fitting.
+    """
+    preprocessor = build_preprocessor()
+    entry_dir = os.path.join(
+        cache_dir, design_cache.design_key(preprocessor, train_path, test_path)
+    )
+    if design_cache.is_complete(entry_dir, design_cache.DESIGN_ARRAYS):
+        logger.info("Reusing design matrices from %s", entry_dir)
+        design_cache.touch(entry_dir)
+        return entry_dir
+
+    train = utils.load_data(train_path, logger)
+    test = utils.load_data(test_path, logger)
+    if train.empty or test.empty:
+        raise ValueError("Data loading failed: Empty DataFrame")
+
+    X = train.drop(columns=["price"])
+    X_test = test.drop(columns=["price"])
+
+    # Applying log transform
+    logger.info("Applying log transform")
+    y_transformed = np.log1p(train["price"])
+
+    logger.info("Fitting the preprocessor")
+    X_train = preprocessor.fit_transform(X, y_transformed)
+
+    os.makedirs(entry_dir, exist_ok=True)
+    with open(os.path.join(entry_dir, "preprocessor.pkl"), "wb") as file:
+        pickle.dump(preprocessor, file)
+
+    export_preprocessor(
+        preprocessor, X, schema.build_input_schema(X, logger), entry_dir, logger
+    )
+
+    design_cache.save_arrays(
+        entry_dir,
+        {
+            "X_train": np.asarray(X_train, dtype=np.float64),
+            "y_train": y_transformed.to_numpy(),
+            "X_test": np.asarray(preprocessor.transform(X_test), dtype=np.float64),
+            "y_test": test["price"].to_numpy(),
+        },
+        logger,
+        meta={"train": train_path, "test": test_path},
+    )
+    return entry_dir
+
+
+def save_model(pipeline, X_check, model_path: str, logger: logging) -> None:
+    # Save the pipeline
+    logger.info("Saving the model")
+    with open(os.path.join(model_path, "real_estate_predictor.pkl"), "wb") as file:
+        pickle.dump(pipeline, file)
+
+    # Flattened copy of the forest for low-latency inference, checked
+    # against sklearn on the training rows before it is written
+    logger.info("Exporting flattened forest")
+    regressor = pipeline[-1]
+    flat_forest = forest.flatten_forest(regressor, logger)
+    forest.check_parity(regressor, flat_forest, X_check, logger)
+    forest.save_forest(flat_forest, os.path.join(model_path, "forest.npz"), logger)
+
+
+def train_model(
+    train: pd.DataFrame, params: dict, model_path: str = "models"
+) -> Pipeline:
+    """Fit and export the price pipeline from a training frame.
+
+    Writes the same artifacts as the model_building stage, without the
+    design cache, which is keyed on the train/test files.
+    """
+    if train.empty:
+        raise ValueError("Data loading failed: Empty DataFrame")
+    os.makedirs(model_path, exist_ok=True)
+
+    X = train.drop(columns=["price"])
+    y_transformed = np.log1p(train["price"])
+
+    logger.info("Fitting the preprocessor")
+    preprocessor = build_preprocessor()
+    X_train = np.asarray(preprocessor.fit_transform(X, y_transformed), dtype=np.float64)
+    export_preprocessor(
+        preprocessor, X, schema.build_input_schema(X, logger), model_path, logger
+    )
+
+    logger.info("Fitting the model")
+    regressor = build_model(params)
+    regressor.fit(X_train, y_transformed.to_numpy())
+    pipeline = Pipeline([("preprocessor", preprocessor), ("regressor", regressor)])
+
+    save_model(pipeline, X_train, model_path, logger)
+    return pipeline
+
 
 if __name__ == "__main__":
     try:
         # loading params
         params = utils.load_params("params.yaml", "model_building", logger)
+        cache_params = utils.load_params("params.yaml", "design_cache", logger)
 
-        # load data
         data_path = os.path.join("data", "processed")
-        file_path = os.path.join(data_path, "train.csv")
-        df = utils.load_data(file_path, logger)
-        if df.empty:
-            raise ValueError("Data loading failed: Empty DataFrame")
-
-        X = df.drop(columns=["price"])
-        y = df["price"]
-
-        # Applying log transform
-        logger.info("Applying log transform")
-        y_transformed = np.log1p(y)
-
-        columns_to_encode = [
-            "property_type",
-            "sector",
-            "balcony",
-            "agePossession",
-            "furnishing_type",
-            "luxury_category",
-            "floor_category",
-        ]
-
-        # Create the pipeline
-        preprocessor = ColumnTransformer(
-            transformers=[
-                (
-                    "num",
-                    StandardScaler(),
-                    [
-                        "bedRoom",
-                        "bathroom",
-                        "built_up_area",
-                        "servant room",
-                        "store room",
-                    ],
-                ),
-                ("cat", OrdinalEncoder(), columns_to_encode),
-                (
-                    "cat1",
-                    OneHotEncoder(drop="first", sparse_output=False),
-                    ["agePossession"],
-                ),
-                ("target_enc", ce.TargetEncoder(handle_unknown="ignore"), ["sector"]),
-            ],
-            remainder="passthrough",
-        )
-
-        model = RandomForestRegressor(
-            n_estimators=params["n_estimators"],
-            max_depth=params["max_depth"],
-            max_samples=params["max_samples"],
-            max_features=params["max_features"],
-        )
-
-        pipeline = Pipeline([("preprocessor", preprocessor), ("regressor", model)])
-
-        logger.info("Fitting the model")
-        pipeline.fit(X, y_transformed)
-
-        # Save the pipeline
+        data_format = utils.get_data_format(logger)
+        train_path = os.path.join(data_path, utils.data_file("train", data_format))
         model_path = os.path.join("models")
         os.makedirs(model_path, exist_ok=True)
 
-        logger.info("Saving the model")
-        with open(os.path.join(model_path, "real_estate_predictor.pkl"), "wb") as file:
-            pickle.dump(pipeline, file)
-        
-        logger.info("Saving artifact")
-        with open(os.path.join(model_path, "df.pkl"), "wb") as file:
-            pickle.dump(X, file)
+        if params.get("training_mode", "in_memory") == "chunked":
+            # train.csv is streamed twice and never held in memory at once
+            logger.info("Fitting the model in chunks")
+            pipeline, input_schema, sample = incremental.fit_chunked(
+                build_preprocessor(),
+                build_model(params),
+                train_path,
+                params.get("memory_limit_mb", 1024),
+                logger,
+            )
+            preprocessor, regressor = pipeline[0], pipeline[-1]
+            X_check = preprocessor.transform(sample)
+            export_preprocessor(preprocessor, sample, input_schema, model_path, logger)
+        else:
+            entry_dir = prepare_design(
+                train_path,
+                os.path.join(data_path, utils.data_file("test", data_format)),
+                design_cache.DESIGN_CACHE_DIR,
+                logger,
+            )
+            design = design_cache.load_arrays(entry_dir, ["X_train", "y_train"])
+            with open(os.path.join(entry_dir, "preprocessor.pkl"), "rb") as file:
+                preprocessor = pickle.load(file)
+
+            logger.info("Fitting the model")
+            regressor = build_model(params)
+            regressor.fit(design["X_train"], design["y_train"])
+            pipeline = Pipeline(
+                [("preprocessor", preprocessor), ("regressor", regressor)]
+            )
+            X_check = design["X_train"]
+
+            # Frozen preprocessor and input schema only depend on the design
+            for file_name in ("preprocessor.json", "input_schema.json"):
+                shutil.copyfile(
+                    os.path.join(entry_dir, file_name),
+                    os.path.join(model_path, file_name),
+                )
+            design_cache.prune(
+                design_cache.DESIGN_CACHE_DIR,
+                cache_params.get("max_entries", 3),
+                logger,
+            )
+
+        save_model(pipeline, X_check, model_path, logger)
 
     except Exception as e:
         logger.error(f"Error : {e}")
@@ -4,29 +4,45 @@ import pandas as pd
 import os
 import pickle
 
-from sklearn.metrics import mean_absolute_error, r2_score
 from dvclive import Live
 
 import src.utils as utils
+from src.models import design_cache, evaluation, predict, schema
+from src.models.model_building import build_preprocessor
 
 # Logging configuration
 logger = utils.configure_logger(__name__, log_file="model_evaluation.log")
 
 
+def log_segments(live: Live, segments: pd.DataFrame, max_groups: int) -> None:
+    # The largest groups of each segment column as metrics, the full table
+    # is saved separately
+    for segment, groups in segments.groupby("segment"):
+        for row in groups.nlargest(max_groups, "rows").itertuples():
+            for metric in ("mae", "mape", "r2"):
+                value = getattr(row, metric)
+                if not np.isnan(value):
+                    live.log_metric(
+                        f"segments/{segment}/{row.group}/{metric}", value, plot=False
+                    )
+
+
+def latency_sample(file_path: str, n_rows: int, logger) -> pd.DataFrame:
+    # A chunk read on its own infers its own dtypes, e.g. a numeric balcony
+    # the encoders reject, so it is read with the ones of the input schema
+    schema_path = os.path.join("models", "input_schema.json")
+    if not os.path.exists(schema_path):
+        return utils.load_data(file_path, logger).drop(columns="price").head(n_rows)
+    dtype = schema.input_dtypes(schema.load_input_schema(schema_path))
+    return next(predict.read_chunks(file_path, n_rows, dtype)).drop(columns="price")
+
+
 if __name__ == "__main__":
     try:
         # loading params
         params = utils.load_params("params.yaml", "all", logger)
-
-        # load data
-        data_path = os.path.join("data", "processed")
-        file_path = os.path.join(data_path, "test.csv")
-        df = utils.load_data(file_path, logger)
-        if df.empty:
-            raise ValueError("Data loading failed: Empty DataFrame")
-
-        X_test = df.drop("price", axis=1)
-        y_test = df["price"]
+        eval_params = params.get("evaluation", {})
+        segment_columns = eval_params.get("segments", ["sector", "property_type"])
 
         # load model
         logger.info("Loading model")
@@ -38,16 +54,111 @@ if __name__ == "__main__":
 
         logger.info("Model loaded successfully")
 
-        logger.info("Evaluating model")
-        y_pred = np.expm1(model.predict(X_test))
+        # The encoded test matrix cached by model_building, when it matches the
+        # current data and preprocessor and the model was fitted from it,
+        # otherwise the test file
+        training_mode = params.get("model_building", {}).get(
+            "training_mode", "in_memory"
+        )
+        data_format = utils.get_data_format(logger)
+        data_path = os.path.join("data", "processed")
+        file_path = os.path.join(data_path, utils.data_file("test", data_format))
+        entry_dir = os.path.join(
+            design_cache.DESIGN_CACHE_DIR,
+            design_cache.design_key(
+                build_preprocessor(),
+                os.path.join(data_path, utils.data_file("train", data_format)),
+                file_path,
+            ),
+        )
 
-        mae = mean_absolute_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
+        logger.info("Evaluating model")
+        batch_sizes = eval_params.get("latency_batch_sizes", [1, 10, 100, 1000])
+        if training_mode == "in_memory" and design_cache.is_complete(
+            entry_dir, design_cache.DESIGN_ARRAYS
+        ):
+            logger.info("Using cached test matrix from %s", entry_dir)
+            design = design_cache.load_arrays(entry_dir, ["X_test", "y_test"])
+            y_test = np.asarray(design["y_test"])
+            y_pred = np.expm1(model[-1].predict(design["X_test"]))
+            # Only the segment columns are parsed
+            segments = utils.load_data(file_path, logger, columns=segment_columns)
+            sample = None
+        else:
+            df = utils.load_data(file_path, logger)
+            if df.empty:
+                raise ValueError("Data loading failed: Empty DataFrame")
+
+            X_test = df.drop("price", axis=1)
+            y_test = df["price"].to_numpy()
+            y_pred = np.expm1(model.predict(X_test))
+            segments = df[segment_columns]
+            sample = X_test.head(max(batch_sizes))
+
+        metrics = evaluation.regression_metrics(y_test, y_pred)
+        logger.info("Test metrics: %s", metrics)
+
+        segments = segments.assign(
+            price_band=evaluation.price_bands(
+                y_test, eval_params.get("price_bands", [0.5, 1, 2, 5])
+            )
+        )
+        segment_table = evaluation.segment_metrics(segments, y_test, y_pred)
+        segment_table.to_csv(
+            os.path.join(model_path, "segment_metrics.csv"), index=False
+        )
+
+        logger.info("Bootstrapping confidence intervals")
+        intervals = evaluation.bootstrap_ci(
+            y_test,
+            y_pred,
+            n_resamples=eval_params.get("n_bootstrap", 1000),
+            confidence=eval_params.get("confidence", 0.95),
+            batch_size=eval_params.get("bootstrap_batch", 200),
+            random_state=eval_params.get("random_state", 42),
+        )
+
+        logger.info("Profiling predict latency")
+        latency = None
+        try:
+            if sample is None:
+                sample = latency_sample(file_path, max(batch_sizes), logger)
+            latency = evaluation.latency_profile(
+                model.predict,
+                sample,
+                batch_sizes,
+                eval_params.get("latency_repeats", 5),
+            )
+            logger.info("Latency profile:\n%s", latency.to_string(index=False))
+        except Exception as e:
+            # The metrics above are still recorded
+            logger.warning(f"Latency profiling failed: {e}")
 
         logger.info("Recording metrics and params")
         with Live(save_dvc_exp=True) as live:
-            live.log_metric("mae", mae)
-            live.log_metric("r2", r2)
+            for name, value in metrics.items():
+                live.log_metric(name, value)
+            for name, interval in intervals.items():
+                for bound, value in interval.items():
+                    live.log_metric(f"ci/{name}/{bound}", value, plot=False)
+
+            log_segments(live, segment_table, eval_params.get("max_groups", 10))
+
+            if latency is not None:
+                for row in latency.itertuples():
+                    live.log_metric(
+                        f"latency/batch_{row.batch_size}/ms_per_row",
+                        row.ms_per_row,
+                        plot=False,
+                    )
+                live.log_plot(
+                    "latency",
+                    latency[["batch_size", "ms_per_row"]].to_dict("records"),
+                    x="batch_size",
+                    y="ms_per_row",
+                    template="linear",
+                    title="Predict latency per row",
+                )
 
             for module, content in params.items():
                 for key, value in content.items():
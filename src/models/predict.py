@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+
+import os
+import time
+import pickle
+import argparse
+import logging
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.models import forest, prediction_cache, schema
+from src.models.schema import FEATURE_COLUMNS
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="predict.log")
+
+# Half-width of the price band (in Cr) for predictions below each bound
+CI_BANDS = [(0.5, 0.05), (1.0, 0.12), (np.inf, 0.22)]
+
+# Set in each worker process by _init_worker
+_pipeline = None
+_cache = None
+
+
+def get_ci(price):
+    # Vectorised version of the banding used on the Price Predictor page
+    price = np.asarray(price, dtype=np.float64)
+    bounds = np.array([bound for bound, _ in CI_BANDS])
+    widths = np.array([width for _, width in CI_BANDS])
+    band = np.searchsorted(bounds, price, side="right")
+    return widths[np.minimum(band, len(widths) - 1)]
+
+
+def predict_prices(
+    pipeline, df: pd.DataFrame, flat_forest: dict = None, preprocessor=None
+) -> pd.DataFrame:
+    # Price and band for every row; the input columns are kept as they are.
+    # The flattened forest and frozen preprocessor replace the matching
+    # pipeline step when given.
+    if flat_forest is None and preprocessor is None:
+        log_price = pipeline.predict(df[FEATURE_COLUMNS])
+    else:
+        if preprocessor is None:
+            preprocessor = pipeline[:-1]
+        features = preprocessor.transform(df[FEATURE_COLUMNS])
+        if flat_forest is None:
+            log_price = pipeline[-1].predict(features)
+        else:
+            log_price = forest.predict_forest(flat_forest, features)
+    price = np.expm1(log_price)
+    ci = get_ci(price)
+    return df.assign(price=price, price_low=price - ci, price_high=price + ci)
+
+
+def load_pipeline(model_path: str):
+    with open(model_path, "rb") as file:
+        return pickle.load(file)
+
+
+def _init_worker(model_path: str, cache_size: int = 0, area_bucket: float = None):
+    # Each worker unpickles the model once instead of receiving it per chunk
+    global _pipeline, _cache
+    _pipeline = load_pipeline(model_path)
+    if cache_size:
+        _cache = prediction_cache.get_cache(
+            model_path, max_size=cache_size, area_bucket=area_bucket
+        )
+
+
+def _predict_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    if _cache is None:
+        return predict_prices(_pipeline, df)
+    # Repeated listings are priced once per worker
+    return _cache.predict(df, lambda rows: predict_prices(_pipeline, rows))
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    return values.where(values.isna(), values.astype(str))
+
+
+def read_chunks(file_path: str, chunk_size: int, dtype: dict = None):
+    # Without `dtype` every CSV chunk infers its own types, e.g. balcony is
+    # numeric in a chunk without '3+' and the encoders fail on it
+    dtype = dtype or {}
+    for chunk in utils.read_chunks(file_path, chunk_size, dtype=dtype):
+        # Parquet columns keep the file's types, text ones are converted
+        for column, kind in dtype.items():
+            if kind is str and column in chunk and chunk[column].dtype != object:
+                chunk[column] = _as_text(chunk[column])
+        yield chunk
+
+
+class ChunkWriter:
+    """Append prediction chunks to a CSV or Parquet file as they arrive"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.parquet = file_path.endswith(".parquet")
+        self._writer = None
+        self._header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.parquet:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.file_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            mode = "w" if self._header else "a"
+            df.to_csv(self.file_path, mode=mode, header=self._header, index=False)
+            self._header = False
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def predict_file(
+    input_path: str,
+    output_path: str,
+    model_path: str,
+    logger: logging,
+    chunk_size: int = 50000,
+    n_jobs: int = 1,
+    cache_size: int = 0,
+    area_bucket: float = None,
+    schema_path: str = None,
+) -> int:
+    logger.info("Pricing %s in chunks of %d rows", input_path, chunk_size)
+    # The input schema is saved next to the model
+    if schema_path is None:
+        schema_path = os.path.join(os.path.dirname(model_path), "input_schema.json")
+    dtype = None
+    if os.path.exists(schema_path):
+        dtype = schema.input_dtypes(schema.load_input_schema(schema_path))
+    else:
+        logger.warning("No input schema at %s, chunk dtypes are inferred", schema_path)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    writer = ChunkWriter(output_path)
+    start = time.perf_counter()
+    n_rows = 0
+
+    def write(result: pd.DataFrame) -> None:
+        nonlocal n_rows
+        writer.write(result)
+        n_rows += len(result)
+        elapsed = time.perf_counter() - start
+        logger.debug("%d rows done, %.0f rows/sec", n_rows, n_rows / elapsed)
+
+    try:
+        if n_jobs == 1:
+            _init_worker(model_path, cache_size, area_bucket)
+            for chunk in read_chunks(input_path, chunk_size, dtype):
+                write(_predict_chunk(chunk))
+            if _cache is not None:
+                logger.info("Prediction cache: %s", _cache.stats())
+        else:
+            # Keep at most two chunks per worker in flight so memory stays
+            # bounded, and write results back in input order
+            with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                initializer=_init_worker,
+                initargs=(model_path, cache_size, area_bucket),
+            ) as executor:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size, dtype):
+                    if len(pending) >= 2 * n_jobs:
+                        write(pending.popleft().result())
+                    pending.append(executor.submit(_predict_chunk, chunk))
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Priced %d rows in %.2fs (%.0f rows/sec)",
+        n_rows,
+        elapsed,
+        n_rows / elapsed if elapsed else 0.0,
+    )
+    return n_rows
+
+
+if __name__ == "__main__":
+    params = utils.load_params("params.yaml", "predict", logger)
+
+    parser = argparse.ArgumentParser(description="Batch price prediction")
+    parser.add_argument("input", help="CSV or Parquet file with the page inputs")
+    parser.add_argument("output", help="CSV or Parquet file to write")
+    parser.add_argument(
+        "--model", default=os.path.join("models", "real_estate_predictor.pkl")
+    )
+    parser.add_argument(
+        "--schema", help="input schema, defaults to input_schema.json beside --model"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=params.get("chunk_size", 50000)
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=params.get("n_jobs", 1),
+        help="worker processes, -1 for one per CPU",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=params.get("cache_size", 0),
+        help="distinct inputs to keep per process, 0 to disable the cache",
+    )
+    parser.add_argument(
+        "--area-bucket",
+        type=float,
+        default=params.get("area_bucket"),
+        help="snap built_up_area to multiples of this before caching",
+    )
+    args = parser.parse_args()
+
+    try:
+        n_jobs = os.cpu_count() if args.n_jobs == -1 else args.n_jobs
+        predict_file(
+            args.input,
+            args.output,
+            args.model,
+            logger,
+            chunk_size=args.chunk_size,
+            n_jobs=n_jobs,
+            cache_size=args.cache_size,
+            area_bucket=args.area_bucket,
+            schema_path=args.schema,
+        )
+
+    except Exception as e:
+        logger.error(f"Error : {e}")
@@ -0,0 +1,259 @@
+import numpy as np
+import pandas as pd
+
+import os
+import time
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from src.models.schema import FEATURE_COLUMNS
+
+NUMERIC_COLUMNS = ["bedRoom", "bathroom", "built_up_area", "servant room", "store room"]
+RESULT_COLUMNS = ["price", "price_low", "price_high"]
+
+# One cache per model file and settings, shared by everything in the process
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """LRU + TTL cache of price predictions keyed on the 12 input fields.
+
+    Keys are canonicalised (numbers as floats, missing values as None) but
+    only inputs the model cannot tell apart share a key, and `predict_fn`
+    gets the original rows. `built_up_area` can be snapped to a bucket, in
+    which case the bucketed area is also what gets predicted so results
+    stay deterministic. Entries are dropped whenever the model file's
+    content hash changes.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        max_size: int = 10000,
+        ttl_seconds: float = None,
+        area_bucket: float = None,
+    ):
+        self.model_path = model_path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.area_bucket = area_bucket
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature = None
+        self._pinned = False
+        self.model_hash = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._miss_seconds = 0.0
+
+    def _number(self, column: str, value):
+        if value is None or pd.isna(value):
+            return None
+        value = float(value)
+        if column == "built_up_area" and self.area_bucket:
+            value = float(round(value / self.area_bucket) * self.area_bucket)
+        return value
+
+    @staticmethod
+    def _category(value):
+        # The encoders see 1 and '1' as different categories, so the type
+        # is part of the key for anything but text
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        if isinstance(value, str):
+            return value
+        return (type(value).__name__, value)
+
+    def canonical(self, record: dict) -> tuple:
+        return tuple(
+            (
+                self._number(column, record[column])
+                if column in NUMERIC_COLUMNS
+                else self._category(record[column])
+            )
+            for column in FEATURE_COLUMNS
+        )
+
+    def _canonical_frame(self, df: pd.DataFrame) -> list:
+        # Same keys as canonical(), built column by column
+        columns = []
+        for column in FEATURE_COLUMNS:
+            if column in NUMERIC_COLUMNS:
+                values = df[column].to_numpy(dtype=np.float64)
+                if column == "built_up_area" and self.area_bucket:
+                    values = np.round(values / self.area_bucket) * self.area_bucket
+                keys = values.astype(object)
+                keys[np.isnan(values)] = None
+                columns.append(keys.tolist())
+            else:
+                columns.append([self._category(value) for value in df[column].tolist()])
+        return list(zip(*columns))
+
+    def _invalidate(self, model_hash: str) -> None:
+        if self.model_hash is not None and model_hash != self.model_hash:
+            self._entries.clear()
+            self.invalidations += 1
+        self.model_hash = model_hash
+
+    def _check_model(self) -> None:
+        # Stat on every call, hash only when the file looks different
+        if self._pinned:
+            return
+        stat = os.stat(self.model_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        self._invalidate(file_hash(self.model_path))
+        self._signature = signature
+
+    def pin(self, model_hash: str) -> None:
+        """Key entries on the model held in memory instead of the file.
+
+        For callers that keep a loaded model and reload it themselves: the
+        model file is no longer checked and entries are dropped when the
+        pinned hash changes.
+        """
+        with self._lock:
+            self._pinned = True
+            self._invalidate(model_hash)
+
+    def _get(self, key, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, stored_at = entry
+        if self.ttl_seconds is not None and now - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put(self, key, result, now: float) -> None:
+        self._entries[key] = (result, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, record: dict):
+        """Cached price columns for one record, or None.
+
+        Only hits are counted here, a miss is counted once the record goes
+        through predict().
+        """
+        key = self.canonical(record)
+        with self._lock:
+            self._check_model()
+            result = self._get(key, time.monotonic())
+            if result is None:
+                return None
+            self.hits += 1
+        return dict(zip(RESULT_COLUMNS, result))
+
+    def predict(self, df: pd.DataFrame, predict_fn) -> pd.DataFrame:
+        """Prices for every row of `df`, calling `predict_fn` on misses only.
+
+        `predict_fn` takes a frame with the first row of `df` for every
+        missing key and returns one with the price, price_low and
+        price_high columns.
+        """
+        keys = self._canonical_frame(df)
+
+        with self._lock:
+            self._check_model()
+            now = time.monotonic()
+            cached = [self._get(key, now) for key in keys]
+
+        # First row of every missing key, as it was given
+        first = {}
+        for i, (key, hit) in enumerate(zip(keys, cached)):
+            if hit is None:
+                first.setdefault(key, i)
+        missing = list(first)
+        computed = {}
+        if missing:
+            rows = df.iloc[list(first.values())][FEATURE_COLUMNS].reset_index(drop=True)
+            if self.area_bucket:
+                area = FEATURE_COLUMNS.index("built_up_area")
+                rows["built_up_area"] = [key[area] for key in missing]
+            start = time.perf_counter()
+            result = predict_fn(rows)
+            elapsed = time.perf_counter() - start
+            values = result[RESULT_COLUMNS].to_numpy(dtype=np.float64)
+            computed = {key: tuple(row) for key, row in zip(missing, values.tolist())}
+
+        with self._lock:
+            now = time.monotonic()
+            for key, result in computed.items():
+                self._put(key, result, now)
+            # Repeats of a missing key within the frame are predicted once,
+            # so they count as hits
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            if computed:
+                self._miss_seconds += elapsed
+
+        rows = [
+            hit if hit is not None else computed[key] for key, hit in zip(keys, cached)
+        ]
+        values = np.array(rows, dtype=np.float64).reshape(
+            len(rows), len(RESULT_COLUMNS)
+        )
+        return df.assign(**dict(zip(RESULT_COLUMNS, values.T)))
+
+    def current_model_hash(self) -> str:
+        # Content hash of the model file now, re-hashed only when it changed
+        with self._lock:
+            self._check_model()
+            return self.model_hash
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            per_miss = self._miss_seconds / self.misses if self.misses else 0.0
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.hits * per_miss,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_hash": self.model_hash,
+            }
+
+
+def get_cache(
+    model_path: str,
+    max_size: int = 10000,
+    ttl_seconds: float = None,
+    area_bucket: float = None,
+) -> PredictionCache:
+    # Streamlit reruns and server handlers all get the same instance
+    key = (os.path.abspath(model_path), max_size, ttl_seconds, area_bucket)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = PredictionCache(
+                model_path, max_size, ttl_seconds, area_bucket
+            )
+        return _caches[key]
@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+
+import os
+import json
+import time
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from src.models import predict, prediction_cache
+from src.models.schema import FEATURE_COLUMNS
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="price_grid.log")
+
+NUMERIC_COLUMNS = ["bedRoom", "bathroom", "servant room", "store room"]
+# Every input except the area, which the grid interpolates over
+KEY_COLUMNS = [column for column in FEATURE_COLUMNS if column != "built_up_area"]
+
+# Set in each worker process by _init_worker
+_pipeline = None
+
+
+def combination_key(record: dict) -> str:
+    # Canonical string for the discrete inputs of a record
+    values = []
+    for column in KEY_COLUMNS:
+        value = record[column]
+        values.append(
+            repr(float(value)) if column in NUMERIC_COLUMNS else str(value).strip()
+        )
+    return "\x1f".join(values)
+
+
+def enumerate_combinations(X: pd.DataFrame, expand=()) -> pd.DataFrame:
+    # Combinations seen in training, crossed with the full domain of the
+    # `expand` columns
+    observed = [column for column in KEY_COLUMNS if column not in expand]
+    combinations = X[observed].drop_duplicates()
+    for column in expand:
+        domain = pd.DataFrame({column: X[column].drop_duplicates()})
+        combinations = combinations.merge(domain, how="cross")
+    return combinations[KEY_COLUMNS].reset_index(drop=True)
+
+
+def _init_worker(model_path: str) -> None:
+    global _pipeline
+    _pipeline = predict.load_pipeline(model_path)
+
+
+def _predict_block(combinations: pd.DataFrame, areas: np.ndarray) -> np.ndarray:
+    # Every combination at every grid area, in one predict call
+    rows = combinations.loc[combinations.index.repeat(len(areas))]
+    rows = rows.assign(built_up_area=np.tile(areas, len(combinations)))
+    log_price = _pipeline.predict(rows[FEATURE_COLUMNS])
+    return log_price.reshape(len(combinations), len(areas))
+
+
+def build_price_grid(
+    model_path: str,
+    X: pd.DataFrame,
+    logger: logging,
+    expand=(),
+    area_points: int = 32,
+    batch_rows: int = 100000,
+    n_jobs: int = 1,
+) -> dict:
+    combinations = enumerate_combinations(X, expand)
+    areas = np.geomspace(
+        X["built_up_area"].min(), X["built_up_area"].max(), area_points
+    )
+    logger.info("Evaluating %d combinations x %d areas", len(combinations), len(areas))
+
+    step = max(1, batch_rows // len(areas))
+    blocks = [
+        combinations.iloc[i : i + step] for i in range(0, len(combinations), step)
+    ]
+    if n_jobs == 1:
+        _init_worker(model_path)
+        log_price = [_predict_block(block, areas) for block in blocks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker, initargs=(model_path,)
+        ) as executor:
+            log_price = list(
+                executor.map(_predict_block, blocks, [areas] * len(blocks))
+            )
+
+    keys = [combination_key(record) for record in combinations.to_dict("records")]
+    return {
+        # The grid is only valid for the model it was evaluated with
+        "model_hash": np.array(prediction_cache.file_hash(model_path)),
+        "keys": np.array(keys),
+        "log_areas": np.log(areas),
+        # Model output, i.e. log1p(price in Cr)
+        "log_price": np.vstack(log_price).astype(np.float32),
+    }
+
+
+def save_price_grid(grid: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving price grid to %s", file_path)
+    np.savez_compressed(file_path, **grid)
+
+
+def load_price_grid(file_path: str) -> dict:
+    with np.load(file_path) as data:
+        grid = {key: data[key] for key in data.files}
+    if "model_hash" in grid:
+        grid["model_hash"] = str(grid["model_hash"])
+    grid["positions"] = {key: i for i, key in enumerate(grid["keys"].tolist())}
+    return grid
+
+
+def lookup_price(grid: dict, record: dict, model_hash: str = None):
+    # Interpolated price, or None when the combination or area is off-grid.
+    # With `model_hash`, also None when the grid was built for another model
+    if model_hash is not None and grid.get("model_hash") != model_hash:
+        return None
+    row = grid["positions"].get(combination_key(record))
+    log_area = np.log(float(record["built_up_area"]))
+    log_areas = grid["log_areas"]
+    if row is None or not log_areas[0] <= log_area <= log_areas[-1]:
+        return None
+    return float(np.expm1(np.interp(log_area, log_areas, grid["log_price"][row])))
+
+
+def _errors(looked_up: np.ndarray, direct: np.ndarray) -> dict:
+    error = np.abs(looked_up - direct)
+    relative = error / direct
+    return {
+        "mae_vs_model": float(error.mean()),
+        "max_abs_error_vs_model": float(error.max()),
+        "median_rel_error_vs_model": float(np.median(relative)),
+        "p95_rel_error_vs_model": float(np.percentile(relative, 95)),
+    }
+
+
+def sample_grid_records(grid: dict, n_samples: int, seed: int = 0) -> pd.DataFrame:
+    # Random grid combinations at random in-range areas, so interpolation
+    # error is measured even where the test split has no coverage
+    rng = np.random.default_rng(seed)
+    keys = grid["keys"][rng.integers(0, len(grid["keys"]), n_samples)]
+    rows = pd.DataFrame(
+        [key.split("\x1f") for key in keys.tolist()], columns=KEY_COLUMNS
+    )
+    rows[NUMERIC_COLUMNS] = rows[NUMERIC_COLUMNS].astype(np.float64)
+    log_areas = grid["log_areas"]
+    rows["built_up_area"] = np.exp(rng.uniform(log_areas[0], log_areas[-1], n_samples))
+    return rows[FEATURE_COLUMNS]
+
+
+def accuracy_report(
+    pipeline, grid: dict, df: pd.DataFrame, logger: logging, n_samples: int = 2000
+) -> dict:
+    # Grid lookups against direct model calls, on the held-out rows the grid
+    # covers and on random points of the grid itself
+    records = df[FEATURE_COLUMNS].to_dict("records")
+    looked_up = np.array(
+        [lookup_price(grid, record) for record in records], dtype=np.float64
+    )
+    covered = ~np.isnan(looked_up)
+    logger.info("Grid covers %d of %d test rows", covered.sum(), len(records))
+
+    report = {"test_rows": len(records), "coverage": float(covered.mean())}
+    if covered.any():
+        direct = np.expm1(pipeline.predict(df[FEATURE_COLUMNS]))
+        report["test"] = _errors(looked_up[covered], direct[covered])
+        if "price" in df:
+            actual = df["price"].to_numpy()[covered]
+            report["test"]["mae_grid_vs_actual"] = float(
+                np.abs(looked_up[covered] - actual).mean()
+            )
+            report["test"]["mae_model_vs_actual"] = float(
+                np.abs(direct[covered] - actual).mean()
+            )
+
+    sample = sample_grid_records(grid, n_samples)
+    sample_records = sample.to_dict("records")
+    start = time.perf_counter()
+    looked_up = np.array([lookup_price(grid, record) for record in sample_records])
+    lookup_us = (time.perf_counter() - start) * 1e6 / n_samples
+
+    start = time.perf_counter()
+    direct = np.expm1(pipeline.predict(sample.iloc[:1]))
+    model_single_us = (time.perf_counter() - start) * 1e6
+    direct = np.expm1(pipeline.predict(sample))
+
+    report["grid_sample"] = _errors(looked_up, direct)
+    report["lookup_us"] = lookup_us
+    report["model_single_row_us"] = model_single_us
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        params = utils.load_params("params.yaml", "price_grid", logger)
+        if not params.get("enabled", False):
+            logger.warning(
+                "price_grid.enabled is false, the page will not use the grid"
+            )
+
+        data_format = utils.get_data_format(logger)
+        data_path = os.path.join("data", "processed")
+        train = utils.load_data(
+            os.path.join(data_path, utils.data_file("train", data_format)), logger
+        )
+        test = utils.load_data(
+            os.path.join(data_path, utils.data_file("test", data_format)), logger
+        )
+        if train.empty or test.empty:
+            raise ValueError("Data loading failed: Empty DataFrame")
+
+        model_path = os.path.join("models", "real_estate_predictor.pkl")
+        grid = build_price_grid(
+            model_path,
+            train.drop(columns=["price"]),
+            logger,
+            expand=params.get("expand", []),
+            area_points=params.get("area_points", 32),
+            batch_rows=params.get("batch_rows", 100000),
+            n_jobs=params.get("n_jobs", 1),
+        )
+        save_price_grid(grid, os.path.join("models", "price_grid.npz"), logger)
+
+        logger.info("Measuring grid accuracy on the test split")
+        report = accuracy_report(
+            predict.load_pipeline(model_path),
+            load_price_grid(os.path.join("models", "price_grid.npz")),
+            test,
+            logger,
+        )
+        logger.info("Price grid report: %s", report)
+        with open(os.path.join("models", "price_grid_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+
+    except Exception as e:
+        logger.error(f"Error : {e}")
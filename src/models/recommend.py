@@ -5,6 +5,7 @@ import os
 import pickle
 
 from src.models.recommender import cosine_sim1, cosine_sim2, cosine_sim3
+from src.models.recommender import ann, artifacts, engine, radius
 
 import src.utils as utils
 
@@ -14,9 +15,23 @@ logger = utils.configure_logger(__name__, log_file="recommend.log")
 
 if __name__ == "__main__":
     try:
-        sim1 = cosine_sim1.get_cosine_sim1(logger)
+        # loading params
+        params = utils.load_params("params.yaml", "recommender", logger)
+
+        facility_mode = params.get("facility_mode", "dense")
+        if facility_mode == "dense":
+            sim1 = cosine_sim1.get_cosine_sim1(logger)
+        elif facility_mode in ("sparse", "svd"):
+            rank = params.get("facility_rank") if facility_mode == "svd" else None
+            sim1 = engine.FactorSimilarity(
+                cosine_sim1.get_facility_factors(logger, rank=rank)
+            )
+        else:
+            raise ValueError(f"Unknown facility_mode: {facility_mode}")
         sim2 = cosine_sim2.get_cosine_sim2(logger)
-        location_df, sim3 = cosine_sim3.get_cosine_sim3(logger)
+        location_df, sim3 = cosine_sim3.get_cosine_sim3(
+            logger, params.get("location_groups")
+        )
         logger.info("Loaded all the similarity matrices")
 
         # Save
@@ -24,19 +39,52 @@ if __name__ == "__main__":
         path = os.path.join("models", "recommend")
         os.makedirs(path, exist_ok=True)
 
-        with open(os.path.join(path, "cosine_sim1.pkl"), "wb") as f:
-            pickle.dump(sim1, f)
-
-        with open(os.path.join(path, "cosine_sim2.pkl"), "wb") as f:
-            pickle.dump(sim2, f)
-
-        with open(os.path.join(path, "cosine_sim3.pkl"), "wb") as f:
-            pickle.dump(sim3, f)
+        artifacts.save_similarities(
+            {"cosine_sim1": sim1, "cosine_sim2": sim2, "cosine_sim3": sim3},
+            path,
+            logger,
+            dtype=params.get("dtype", "float32"),
+        )
 
         with open(os.path.join(path, "location_df.pkl"), "wb") as f:
             pickle.dump(location_df, f)
 
+        logger.info("Building radius index")
+        radius_index = radius.build_radius_index(location_df, logger)
+        radius.save_radius_index(
+            radius_index, os.path.join(path, "radius_index.npz"), logger
+        )
+
+        logger.info("Building top-k index")
+        index = engine.build_topk_index(
+            [sim1, sim2, sim3],
+            params.get("weights", engine.DEFAULT_WEIGHTS),
+            params.get("top_k", 20),
+            logger,
+        )
+        engine.save_topk_index(index, os.path.join(path, "topk_index.npz"), logger)
 
+        ann_params = params.get("ann", {})
+        if ann_params.get("enabled", False) or params.get("backend") == "ann":
+            logger.info("Building ANN index")
+            rank = params.get("facility_rank") if facility_mode == "svd" else None
+            features = ann.weighted_features(
+                [
+                    cosine_sim1.get_facility_factors(logger, rank=rank),
+                    cosine_sim2.get_price_features(logger),
+                    cosine_sim3.get_location_features(location_df),
+                ],
+                params.get("weights", engine.DEFAULT_WEIGHTS),
+                rank=ann_params.get("rank", 64),
+            )
+            ann_index = ann.build_ivf_index(
+                features,
+                params.get("weights", engine.DEFAULT_WEIGHTS),
+                logger,
+                n_lists=ann_params.get("n_lists", 64),
+                n_iter=ann_params.get("n_iter", 20),
+            )
+            ann.save_ivf_index(ann_index, os.path.join(path, "ann_index.npz"), logger)
 
     except Exception as e:
         logger.error("Error loading data: %s", e)
@@ -0,0 +1,117 @@
+import numpy as np
+
+import logging
+
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+
+def _reduce(matrix, rank: int, seed: int):
+    # Rank-`rank` rows whose dot products approximate the cosine similarities
+    # of `matrix`, without densifying a sparse block at its full width
+    if sparse.issparse(matrix):
+        matrix = normalize(matrix.tocsr().astype(np.float64))
+    else:
+        matrix = normalize(np.asarray(matrix, dtype=np.float64))
+    if rank is None or matrix.shape[1] <= rank:
+        return matrix.toarray() if sparse.issparse(matrix) else matrix
+    svd = TruncatedSVD(n_components=rank, random_state=seed)
+    return normalize(svd.fit_transform(matrix))
+
+
+def weighted_features(factors, weights, rank: int = 64, seed: int = 42) -> np.ndarray:
+    # Concatenate unit-norm feature blocks scaled by sqrt(weight), so the inner
+    # product of two rows equals the blended cosine similarity of the pair.
+    # Blocks wider than `rank` are reduced first, keeping the vectors at
+    # most rank * len(factors) wide
+    blocks = []
+    for matrix, weight in zip(factors, weights):
+        blocks.append(np.sqrt(weight) * _reduce(matrix, rank, seed))
+    return np.hstack(blocks).astype(np.float32)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, block_size: int = 4096):
+    labels = np.empty(x.shape[0], dtype=np.int32)
+    for start in range(0, x.shape[0], block_size):
+        rows = slice(start, start + block_size)
+        labels[rows] = np.argmax(x[rows] @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(
+    x: np.ndarray, n_clusters: int, n_iter: int, seed: int = 42
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, x.shape[0])
+    centroids = normalize(x[rng.choice(x.shape[0], n_clusters, replace=False)])
+
+    for _ in range(n_iter):
+        labels = _assign(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        counts = np.bincount(labels, minlength=n_clusters)
+
+        # Re-seed empty lists with random rows
+        empty = counts == 0
+        sums[empty] = x[rng.choice(x.shape[0], int(empty.sum()))]
+        centroids = normalize(sums)
+
+    return centroids.astype(np.float32)
+
+
+def build_ivf_index(
+    features: np.ndarray,
+    weights,
+    logger: logging,
+    n_lists: int = 64,
+    n_iter: int = 20,
+    seed: int = 42,
+) -> dict:
+    logger.debug("Building IVF index with %d lists", n_lists)
+    centroids = spherical_kmeans(features, n_lists, n_iter, seed)
+    labels = _assign(features, centroids)
+
+    # Store vectors grouped by list so each probe reads a contiguous slice
+    order = np.argsort(labels, kind="stable").astype(np.int32)
+    offsets = np.concatenate(
+        [[0], np.cumsum(np.bincount(labels, minlength=len(centroids)))]
+    ).astype(np.int64)
+
+    return {
+        "centroids": centroids,
+        "vectors": features[order],
+        "ids": order,
+        "offsets": offsets,
+        "positions": np.argsort(order).astype(np.int32),
+        "weights": np.asarray(weights, dtype=np.float64),
+    }
+
+
+def save_ivf_index(index: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving IVF index to %s", file_path)
+    np.savez(file_path, **index)
+
+
+def load_ivf_index(file_path: str) -> dict:
+    with np.load(file_path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def search(index: dict, query: np.ndarray, k: int, n_probe: int = 8):
+    probe = np.argsort(-(index["centroids"] @ query))[:n_probe]
+    offsets = index["offsets"]
+    candidates = np.concatenate([np.arange(offsets[p], offsets[p + 1]) for p in probe])
+    if len(candidates) == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+    scores = index["vectors"][candidates] @ query
+    k = min(k, len(candidates))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.lexsort((index["ids"][candidates[best]], -scores[best]))]
+    return index["ids"][candidates[best]], scores[best]
+
+
+def search_row(index: dict, row: int, k: int, n_probe: int = 8):
+    query = index["vectors"][index["positions"][row]]
+    return search(index, query, k, n_probe)
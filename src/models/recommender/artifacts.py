@@ -0,0 +1,129 @@
+import numpy as np
+
+import os
+import json
+import time
+import shutil
+import logging
+
+from scipy import sparse
+
+from src.models.recommender.engine import FactorSimilarity
+
+MANIFEST = "similarity.json"
+VERSION_PREFIX = "similarity-"
+SUPPORTED_DTYPES = ("float64", "float32", "float16")
+
+
+def _write_atomic(file_path: str, write) -> None:
+    # Written aside and renamed over the old file, so readers see either the
+    # old or the new content, never a truncated file
+    partial = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(partial, "wb") as f:
+            write(f)
+        os.replace(partial, file_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def _prune_versions(path: str, keep: set) -> None:
+    # Readers may still be opening the previous set, only older ones go
+    versions = sorted(
+        name
+        for name in os.listdir(path)
+        if name.startswith(VERSION_PREFIX) and name not in keep
+    )
+    for name in versions:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def save_similarities(
+    matrices: dict, path: str, logger: logging, dtype: str = "float32"
+) -> None:
+    """Save the matrices as one version, switched to by the manifest.
+
+    Every call writes a new `similarity-<version>` directory and then
+    atomically replaces the manifest that points at it, so a reader always
+    gets a manifest and matrices from the same save.
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(
+            f"Unsupported dtype {dtype!r}, expected one of {SUPPORTED_DTYPES}"
+        )
+
+    os.makedirs(path, exist_ok=True)
+    previous, legacy = None, []
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        with open(os.path.join(path, MANIFEST), "r") as f:
+            previous_manifest = json.load(f)
+        previous = previous_manifest.get("version")
+        if previous is None:
+            # Saved before versioning, next to the manifest
+            legacy = [entry["file"] for entry in previous_manifest["matrices"].values()]
+    version = f"{VERSION_PREFIX}{time.time_ns()}-{os.getpid()}"
+    os.makedirs(os.path.join(path, version))
+    manifest = {"dtype": dtype, "version": version, "matrices": {}}
+
+    for name, matrix in matrices.items():
+        logger.debug("Saving %s as %s", name, dtype)
+        kind = "dense"
+        if isinstance(matrix, FactorSimilarity):
+            kind, matrix = "factors", matrix.factors
+
+        if sparse.issparse(matrix):
+            # scipy.sparse has no float16 support
+            kind, file_name = "sparse_factors", f"{name}.npz"
+            matrix = matrix.tocsr().astype(np.promote_types(dtype, "float32"))
+            file_path = os.path.join(path, version, file_name)
+            sparse.save_npz(file_path, matrix)
+        else:
+            file_name = f"{name}.npy"
+            matrix = np.ascontiguousarray(matrix, dtype=dtype)
+            file_path = os.path.join(path, version, file_name)
+            np.save(file_path, matrix)
+
+        manifest["matrices"][name] = {
+            "file": os.path.join(version, file_name),
+            "kind": kind,
+            "shape": list(matrix.shape),
+            "bytes": os.path.getsize(file_path),
+        }
+
+    # Last, switching readers over to the new version in one rename
+    _write_atomic(
+        os.path.join(path, MANIFEST),
+        lambda f: f.write(json.dumps(manifest, indent=2).encode()),
+    )
+    _prune_versions(path, {version, previous})
+    for file_name in legacy:
+        if os.path.exists(os.path.join(path, file_name)):
+            os.remove(os.path.join(path, file_name))
+
+
+def load_similarities(path: str, mmap_mode: str = "r") -> dict:
+    # Memory-mapped by default so every worker shares the OS page cache
+    with open(os.path.join(path, MANIFEST), "r") as f:
+        manifest = json.load(f)
+
+    matrices = {}
+    for name, entry in manifest["matrices"].items():
+        file_path = os.path.join(path, entry["file"])
+        kind = entry.get("kind", "dense")
+
+        if kind == "sparse_factors":
+            matrix = sparse.load_npz(file_path).tocsr()
+        else:
+            matrix = np.load(file_path, mmap_mode=mmap_mode)
+            if matrix.dtype != manifest["dtype"]:
+                raise ValueError(f"{entry['file']} does not match {MANIFEST}")
+        if list(matrix.shape) != entry["shape"]:
+            raise ValueError(f"{entry['file']} does not match {MANIFEST}")
+        # Manifests from before versioned saves have no file sizes
+        if os.path.getsize(file_path) != entry.get("bytes", os.path.getsize(file_path)):
+            raise ValueError(f"{entry['file']} changed after {MANIFEST} was written")
+
+        matrices[name] = matrix if kind == "dense" else FactorSimilarity(matrix)
+
+    return matrices
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+import os
+import time
+import argparse
+import logging
+
+from src.models.recommender import ann, engine, cosine_sim1, cosine_sim2, cosine_sim3
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="recommender_benchmark.log")
+
+
+def synthetic_features(n: int, dims=(64, 32, 32), n_clusters: int = 50, seed: int = 0):
+    # Clustered blocks shaped like the facility, price and location features
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, n_clusters, n)
+    blocks = []
+    for dim in dims:
+        centers = rng.normal(size=(n_clusters, dim))
+        blocks.append(centers[labels] + 0.5 * rng.normal(size=(n, dim)))
+    return blocks
+
+
+def apartment_features(params: dict, logger: logging):
+    rank = None
+    if params.get("facility_mode") == "svd":
+        rank = params.get("facility_rank")
+    location_df = cosine_sim3.get_location_df(logger)
+    return [
+        cosine_sim1.get_facility_factors(logger, rank=rank),
+        cosine_sim2.get_price_features(logger),
+        cosine_sim3.get_location_features(location_df),
+    ]
+
+
+def benchmark_ann(
+    features: np.ndarray,
+    weights,
+    logger: logging,
+    k: int = 10,
+    n_queries: int = 200,
+    n_lists_grid=(16, 64, 256),
+    n_probe_grid=(1, 4, 8, 16),
+    seed: int = 0,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(
+        features.shape[0], min(n_queries, features.shape[0]), replace=False
+    )
+
+    # Exact brute-force baseline over the same weighted vectors
+    start = time.perf_counter()
+    exact = [engine.top_k(features @ features[row], k)[0][0] for row in rows]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(rows)
+    results = [
+        {
+            "backend": "exact",
+            "n_lists": None,
+            "n_probe": None,
+            "recall@k": 1.0,
+            "ms/query": exact_ms,
+            "build_s": 0.0,
+        }
+    ]
+
+    for n_lists in n_lists_grid:
+        start = time.perf_counter()
+        index = ann.build_ivf_index(features, weights, logger, n_lists=n_lists)
+        build_s = time.perf_counter() - start
+
+        for n_probe in n_probe_grid:
+            if n_probe > n_lists:
+                continue
+            start = time.perf_counter()
+            found = [ann.search_row(index, row, k, n_probe)[0] for row in rows]
+            ms = (time.perf_counter() - start) * 1000 / len(rows)
+            recall = np.mean(
+                [len(np.intersect1d(f, e)) / len(e) for f, e in zip(found, exact)]
+            )
+            results.append(
+                {
+                    "backend": "ivf",
+                    "n_lists": n_lists,
+                    "n_probe": n_probe,
+                    "recall@k": recall,
+                    "ms/query": ms,
+                    "build_s": build_s,
+                }
+            )
+
+    return pd.DataFrame(results)
+
+
+def benchmark_price_details(df_appartments: pd.DataFrame, n_rows: int) -> pd.DataFrame:
+    # Scale appartments.csv up to n_rows and time both PriceDetails parsers
+    repeats = int(np.ceil(n_rows / len(df_appartments)))
+    df = pd.concat([df_appartments] * repeats, ignore_index=True).iloc[:n_rows]
+
+    start = time.perf_counter()
+    expected = cosine_sim2.parse_price_details_rowwise(df)
+    rowwise_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = cosine_sim2.parse_price_details(df)
+    vectorised_s = time.perf_counter() - start
+
+    # Raises if the two frames differ in any value, dtype or column
+    pd.testing.assert_frame_equal(result, expected)
+
+    return pd.DataFrame(
+        [
+            {"parser": "rowwise", "rows": len(df), "seconds": rowwise_s},
+            {"parser": "vectorised", "rows": len(df), "seconds": vectorised_s},
+        ]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommender stage benchmarks")
+    parser.add_argument("--suite", choices=["ann", "price_details"], default="ann")
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="benchmark on N synthetic projects instead of appartments.csv",
+    )
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    try:
+        if args.suite == "price_details":
+            file_path = os.path.join("data", "raw", "appartments.csv")
+            df_appartments = utils.load_data(file_path, logger).drop(22)
+            results = benchmark_price_details(df_appartments, args.rows)
+        else:
+            params = utils.load_params("params.yaml", "recommender", logger)
+            weights = params.get("weights", engine.DEFAULT_WEIGHTS)
+
+            if args.synthetic:
+                factors = synthetic_features(args.synthetic)
+            else:
+                factors = apartment_features(params, logger)
+            features = ann.weighted_features(
+                factors, weights, rank=params.get("ann", {}).get("rank", 64)
+            )
+
+            logger.info("Benchmarking on %d projects", features.shape[0])
+            results = benchmark_ann(
+                features, weights, logger, k=args.k, n_queries=args.queries
+            )
+        print(results.to_string(index=False))
+
+    except Exception as e:
+        logger.error("Benchmark failed: %s", e)
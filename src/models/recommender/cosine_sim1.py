@@ -5,15 +5,17 @@ import re
 import os
 import logging
 
+from sklearn.decomposition import TruncatedSVD
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
 from src import utils as utils
 
 def extract_list(s):
     return re.findall(r"'(.*?)'", s)
 
-def get_cosine_sim1(logger: logging):
+def get_tfidf_matrix(logger: logging):
     # load appartments
     data_path = os.path.join("data", "raw")
     file_path = os.path.join(data_path, "appartments.csv")
@@ -24,8 +26,24 @@ def get_cosine_sim1(logger: logging):
     df['TopFacilities'] = df['TopFacilities'].apply(extract_list)
     df['FacilitiesStr'] = df['TopFacilities'].apply(' '.join)
 
+    # Rows come out L2-normalised (norm='l2' is the default)
     tfidf_vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
-    tfidf_matrix = tfidf_vectorizer.fit_transform(df['FacilitiesStr'])
+    return tfidf_vectorizer.fit_transform(df['FacilitiesStr'])
+
+def get_facility_factors(logger: logging, rank: int = None):
+    # Unit-norm rows whose dot products are the facility cosine similarities.
+    # Sparse TF-IDF by default, or a dense rank-`rank` approximation.
+    tfidf_matrix = get_tfidf_matrix(logger)
+    if rank is None:
+        return tfidf_matrix.tocsr()
+
+    rank = min(rank, tfidf_matrix.shape[1] - 1)
+    logger.debug("Reducing facilities to rank %d with truncated SVD", rank)
+    svd = TruncatedSVD(n_components=rank, random_state=42)
+    return normalize(svd.fit_transform(tfidf_matrix))
+
+def get_cosine_sim1(logger: logging):
+    tfidf_matrix = get_tfidf_matrix(logger)
 
     cosine_sim1 = cosine_similarity(tfidf_matrix, tfidf_matrix)
 
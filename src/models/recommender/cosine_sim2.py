@@ -6,6 +6,11 @@ import os
 import logging
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import StandardScaler
 
@@ -61,13 +66,15 @@ def refined_parse_modified_v2(detail_str):
     return extracted
 
 
-def get_cosine_sim2(logger: logging):
-    # load appartments
-    data_path = os.path.join("data", "raw")
-    file_path = os.path.join(data_path, "appartments.csv")
-    df_appartments = utils.load_data(file_path, logger).drop(22)
+CONFIGS = ['1 BHK', '2 BHK', '3 BHK', '4 BHK', '5 BHK', '6 BHK', '1 RK', 'Land']
 
-    # Apply the refined parsing and generate the new DataFrame structure
+NUMBER_PATTERN = r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$'
+FLOAT_LIKE_PATTERN = r'(?i)^[\s\d+\-._e]+$|^\s*[+-]?(?:nan|inf|infinity)\s*$|[^\x00-\x7f]'
+
+
+def parse_price_details_rowwise(df_appartments: pd.DataFrame) -> pd.DataFrame:
+    # Reference implementation, kept for the parity checks in benchmark.py
+    # and tests/test_cosine_sim2.py
     data_refined = []
 
     for _, row in df_appartments.iterrows():
@@ -77,7 +84,7 @@ def get_cosine_sim2(logger: logging):
         new_row = {'PropertyName': row['PropertyName']}
         
         # Populate the new row with extracted features
-        for config in ['1 BHK', '2 BHK', '3 BHK', '4 BHK', '5 BHK', '6 BHK', '1 RK', 'Land']:
+        for config in CONFIGS:
             new_row[f'building type_{config}'] = features.get(f'building type_{config}')
             new_row[f'area low {config}'] = features.get(f'area low {config}')
             new_row[f'area high {config}'] = features.get(f'area high {config}')
@@ -86,7 +93,154 @@ def get_cosine_sim2(logger: logging):
         
         data_refined.append(new_row)
 
-    df_final_refined_v2 = pd.DataFrame(data_refined).set_index('PropertyName')
+    return pd.DataFrame(data_refined).set_index('PropertyName')
+
+
+def _decode(detail_str):
+    try:
+        detail_str = detail_str.replace("'", "\"")
+    except AttributeError:
+        return {}
+    try:
+        details = orjson.loads(detail_str) if orjson is not None else json.loads(detail_str)
+    except ValueError:
+        # orjson is stricter than json (NaN, Infinity), so retry before giving up
+        try:
+            details = json.loads(detail_str)
+        except Exception:
+            return {}
+    return details if isinstance(details, dict) else {}
+
+
+def _to_float(parts: pd.Series, relevant: np.ndarray):
+    # Vectorised float() on already cleaned strings; returns (values, parsed)
+    plain = parts.str.match(NUMBER_PATTERN).fillna(False).to_numpy(dtype=bool)
+    values = np.full(len(parts), np.nan)
+    values[plain] = parts[plain].astype(float).to_numpy()
+
+    # Whatever else float() could still accept ('nan', '1_000', non-ASCII
+    # digits, ...) goes through float() itself
+    maybe = parts.str.contains(FLOAT_LIKE_PATTERN).fillna(False).to_numpy(dtype=bool)
+    parsed = plain.copy()
+    candidates = np.flatnonzero(maybe & ~plain & relevant)
+    for i, part in zip(candidates, parts.iloc[candidates].tolist()):
+        try:
+            values[i] = float(part)
+            parsed[i] = True
+        except ValueError:
+            pass
+    return values, parsed
+
+
+def _split_range(parts: pd.Series):
+    # Pieces of 'low - high' and how many '-' separated them
+    n_dashes = parts.str.count('-').fillna(-1).to_numpy(dtype=np.int64)
+    first = parts.str.replace(r'(?s)-.*', '', regex=True)
+    second = parts.str.replace(r'(?s)^[^-]*-', '', regex=True)
+    return first, second, n_dashes
+
+
+def _clean_area(parts: pd.Series) -> pd.Series:
+    return parts.str.replace(',', '', regex=False).str.replace(' sq.ft.', '', regex=False).str.strip()
+
+
+def _clean_price(parts: pd.Series) -> pd.Series:
+    return (
+        parts.str.replace('₹', '', regex=False)
+        .str.replace(' Cr', '', regex=False)
+        .str.replace(' L', '', regex=False)
+        .str.strip()
+    )
+
+
+def _parse_area(area: pd.Series):
+    # Area is a single value or a 'low - high' range
+    first, second, n_dashes = _split_range(area.astype('string[pyarrow]'))
+    low, low_ok = _to_float(_clean_area(first), n_dashes <= 1)
+    high, high_ok = _to_float(_clean_area(second), n_dashes == 1)
+    single = (n_dashes == 0) & low_ok
+    pair = (n_dashes == 1) & low_ok & high_ok
+    return (
+        np.where(single | pair, low, np.nan),
+        np.where(single, low, np.where(pair, high, np.nan)),
+        (single | pair).astype(float),
+    )
+
+
+def _parse_price(price_range: pd.Series):
+    # Price is always a 'low - high' range in Cr, with lakh values divided by 100
+    first, second, n_dashes = _split_range(price_range.astype('string[pyarrow]'))
+    low, low_ok = _to_float(_clean_price(first), n_dashes == 1)
+    high, high_ok = _to_float(_clean_price(second), n_dashes == 1)
+    pair = (n_dashes == 1) & low_ok & high_ok
+    low = np.where(pair, low, np.nan)
+    high = np.where(pair, high, np.nan)
+    low[first.str.contains('L', regex=False).fillna(False).to_numpy(dtype=bool)] /= 100
+    high[second.str.contains('L', regex=False).fillna(False).to_numpy(dtype=bool)] /= 100
+    return low, high, pair.astype(float)
+
+
+def _parse_distinct(values: pd.Series, parse):
+    # Listings repeat the same area and price strings, so parse each one once
+    codes, uniques = pd.factorize(values)
+    parsed = parse(pd.Series(uniques, dtype=object))
+    # code -1 (missing) picks the trailing NaN
+    return [np.append(column, np.nan)[codes] for column in parsed]
+
+
+def parse_price_details(df_appartments: pd.DataFrame) -> pd.DataFrame:
+    # Same frame as parse_price_details_rowwise, built column-wise
+    n = len(df_appartments)
+    configs = frozenset(CONFIGS)
+
+    # One decode pass over the distinct strings, flattened into a long
+    # (row, config) table
+    codes, uniques = pd.factorize(df_appartments['PriceDetails'])
+    decoded = [_decode(detail_str) for detail_str in uniques] + [{}]
+    records = [
+        (row, config, detail.get('building_type'), detail.get('area', ''), detail.get('price-range', ''))
+        for row, code in enumerate(codes)
+        for config, detail in decoded[code].items()
+        if config in configs
+    ]
+    long = pd.DataFrame(records, columns=['row', 'config', 'building_type', 'area', 'price_range'], dtype=object)
+
+    area_low, area_high, area_parsed = _parse_distinct(long['area'], _parse_area)
+    price_low, price_high, price_parsed = _parse_distinct(long['price_range'], _parse_price)
+
+    rows = long['row'].to_numpy(dtype=np.int64)
+    configs = long['config'].to_numpy()
+    building_types = long['building_type'].to_numpy()
+    columns = {}
+    for config in CONFIGS:
+        mask = configs == config
+        building_type = np.full(n, None, dtype=object)
+        building_type[rows[mask]] = building_types[mask]
+        columns[f'building type_{config}'] = building_type
+
+        for name, values, parsed in [
+            ('area low', area_low, area_parsed),
+            ('area high', area_high, area_parsed),
+            ('price low', price_low, price_parsed),
+            ('price high', price_high, price_parsed),
+        ]:
+            column = np.full(n, np.nan)
+            column[rows[mask]] = values[mask]
+            # A column without any parsed float, not even a NaN one like
+            # float('nan'), is object dtype in the row-wise frame
+            columns[f'{name} {config}'] = column if (parsed[mask] == 1).any() else np.full(n, None, dtype=object)
+
+    return pd.DataFrame(columns, index=pd.Index(df_appartments['PropertyName'], name='PropertyName'))
+
+
+def get_price_features(logger: logging):
+    # load appartments
+    data_path = os.path.join("data", "raw")
+    file_path = os.path.join(data_path, "appartments.csv")
+    df_appartments = utils.load_data(file_path, logger).drop(22)
+
+    # Parse the PriceDetails column into one row per property
+    df_final_refined_v2 = parse_price_details(df_appartments)
 
     df_final_refined_v2['building type_Land'] = df_final_refined_v2['building type_Land'].replace({'':'Land'})
 
@@ -100,6 +254,12 @@ def get_cosine_sim2(logger: logging):
     # Apply the scaler to the entire dataframe
     ohe_df_normalized = pd.DataFrame(scaler.fit_transform(ohe_df), columns=ohe_df.columns, index=ohe_df.index)
 
+    return ohe_df_normalized
+
+
+def get_cosine_sim2(logger: logging):
+    ohe_df_normalized = get_price_features(logger)
+
     # Compute the cosine similarity matrix
     cosine_sim2 = cosine_similarity(ohe_df_normalized)
 
@@ -3,6 +3,8 @@ import pandas as pd
 
 import os
 import re
+import ast
+import json
 import logging
 
 from sklearn.metrics.pairwise import cosine_similarity
@@ -11,6 +13,9 @@ from sklearn.preprocessing import StandardScaler
 from difflib import SequenceMatcher
 import src.utils as utils
 
+# 'place': 'distance' pairs as written by repr() of a dict of strings
+LOCATION_PATTERN = re.compile(r"""(('|")(.*?)\2: ('|")(.*?)\4)""")
+
 def extract_list(s):
     return re.findall(r"'(.*?)'", s)
 
@@ -43,68 +48,175 @@ def group_similar_phrases(phrases):
     return groups
 
 
-def get_location_df(logger: logging):
+def _char_counts(phrases, alphabet):
+    counts = np.zeros((len(phrases), len(alphabet)), dtype=np.int32)
+    for row, phrase in enumerate(phrases):
+        for char in phrase:
+            counts[row, alphabet[char]] += 1
+    return counts
+
+
+def group_similar_phrases_blocked(phrases, groups=None, threshold=0.7):
+    # Same groups as group_similar_phrases, optionally continuing from
+    # existing ones. SequenceMatcher.ratio() can never exceed quick_ratio(),
+    # the character-multiset overlap, so keys whose overlap bound is already
+    # <= threshold are skipped without running the expensive ratio.
+    groups = {key: list(values) for key, values in (groups or {}).items()}
+    keys = list(groups.keys())
+    phrases = list(phrases)
+
+    vocabulary = keys + phrases
+    alphabet = {char: i for i, char in enumerate(sorted(set(''.join(vocabulary))))}
+    counts = _char_counts(vocabulary, alphabet)
+    lengths = np.array([len(phrase) for phrase in vocabulary], dtype=np.int64)
+
+    # Rows of `counts` holding the current keys, in insertion order
+    key_rows = np.empty(len(vocabulary), dtype=np.int64)
+    key_rows[:len(keys)] = np.arange(len(keys))
+    n_keys = len(keys)
+
+    for offset, phrase in enumerate(phrases):
+        row = len(keys) + offset
+        candidates = key_rows[:n_keys]
+        overlap = np.minimum(counts[candidates], counts[row]).sum(axis=1)
+        bound = 2.0 * overlap / (lengths[candidates] + lengths[row])
+
+        added = False
+        for candidate in candidates[bound > threshold]:
+            key = vocabulary[candidate]
+            if similar(phrase, key) > threshold:
+                groups[key].append(phrase)
+                added = True
+                break
+        if not added:
+            groups[phrase] = [phrase]
+            key_rows[n_keys] = row
+            n_keys += 1
+    return groups
+
+
+def load_location_groups(file_path: str, threshold: float = 0.7) -> dict:
+    if file_path is None or not os.path.exists(file_path):
+        return {}
+    with open(file_path, "r") as f:
+        cached = json.load(f)
+    # Groups built with another threshold cannot be extended
+    if cached.get("threshold") != threshold:
+        return {}
+    return cached["groups"]
+
+
+def save_location_groups(groups: dict, file_path: str, threshold: float = 0.7) -> None:
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "w") as f:
+        json.dump({"threshold": threshold, "groups": groups}, f, indent=2)
+
+
+def parse_location_advantages(advantages: pd.Series) -> pd.DataFrame:
+    # One pass over the "{'place': 'distance', ...}" strings into a long
+    # (row, location, distance) table, without eval
+    records = []
+    for row, text in enumerate(advantages):
+        if not isinstance(text, str):
+            continue
+        matches = LOCATION_PATTERN.findall(text)
+        if '\\' not in text and '{' + ', '.join(match[0] for match in matches) + '}' == text:
+            pairs = [(match[2], match[4]) for match in matches]
+        else:
+            # Escapes or non-string values, let the literal parser handle it
+            pairs = ast.literal_eval(text).items()
+        records.extend((row, location, distance) for location, distance in pairs)
+    return pd.DataFrame(records, columns=['row', 'location', 'distance'])
+
+
+def _to_float(token):
+    try:
+        return float(token)
+    except ValueError:
+        return np.nan
+
+
+def distances_to_meters(distances: pd.Series) -> np.ndarray:
+    # Vectorised distance_to_meters, non-strings end up as NaN
+    distances = distances.astype(object)
+    first = distances.str.split().str.get(0)
+    values = pd.to_numeric(first, errors='coerce').to_numpy(dtype=np.float64)
+
+    # Tokens float() accepts but to_numeric does not ('1_000', ...)
+    for i in np.flatnonzero(np.isnan(values) & first.notna().to_numpy()):
+        values[i] = _to_float(first.iat[i])
+
+    km = distances.str.contains('Km', regex=False, na=False) | distances.str.contains('KM', regex=False, na=False)
+    meter = distances.str.contains('Meter', regex=False, na=False) | distances.str.contains('meter', regex=False, na=False)
+    return np.where(km.to_numpy(), values * 1000, np.where(meter.to_numpy(), values, np.nan))
+
+
+# Keyed on the groups_path name but not its contents: the file only ever
+# holds the groups a previous call returned, written by get_location_df
+@utils.memoize(paths=[os.path.join("data", "raw", "appartments.csv")])
+def _location_df_and_groups(logger: logging, groups_path: str = None):
     # load appartments
     data_path = os.path.join("data", "raw")
     file_path = os.path.join(data_path, "appartments.csv")
 
     df = utils.load_data(file_path, logger).drop(22)
 
+    long = parse_location_advantages(df['LocationAdvantages'])
 
-    df['TopFacilities'] = df['TopFacilities'].apply(extract_list)
-    df['FacilitiesStr'] = df['TopFacilities'].apply(' '.join)
+    # Sorted so the grouping no longer depends on set order
+    all_locations = sorted(set(long['location']))
 
-    all_locations = []
+    # Group similar phrases, only the ones missing from the cached groups
+    groups = load_location_groups(groups_path)
+    known = {value for values in groups.values() for value in values}
+    new_locations = [loc for loc in all_locations if loc not in known]
+    logger.debug("Grouping %d new location phrases", len(new_locations))
+    groups = group_similar_phrases_blocked(new_locations, groups)
 
-    for loc in df['LocationAdvantages'].dropna().apply(lambda x: eval(x).keys()):
-        all_locations.extend(loc)
+    res = {}
+    for key, values in groups.items():
+        for value in values:
+            res[value] = key
 
-    all_locations = list(set(all_locations))
+    long['location'] = long['location'].map(res)
+    long['meters'] = distances_to_meters(long['distance'])
 
-    # Group similar phrases
-    groups = group_similar_phrases(all_locations)
+    # Columns in order of first appearance; when several phrases of a row map
+    # to the same location the last distance wins, as with the dict before
+    locations = pd.unique(long['location'])
+    long = long.drop_duplicates(subset=['row', 'location'], keep='last')
 
-    # Create a dictionary
-    result_dict = {key: value for key, value in groups.items()}
+    location_matrix = np.full((len(df), len(locations)), np.nan, dtype=np.float32)
+    columns = pd.Index(locations).get_indexer(long['location'])
+    location_matrix[long['row'].to_numpy(), columns] = long['meters'].to_numpy()
 
-    res = {}
-    for key, values in result_dict.items():
-        for value in values:
-            res[value] = key
-    
-    def foo(d):
-        d = eval(d)
-        new_d = {}
-        for key, value in d.items():
-            new_d[res[key]] = value
-        return new_d
-    
-    df['LocationAdvantages'] = df['LocationAdvantages'].apply(foo)
-
-    # Extract distances for each location
-    location_matrix = {}
-    for index, row in df.iterrows():
-        distances = {}
-        for location, distance in row['LocationAdvantages'].items():
-            distances[location] = distance_to_meters(distance)
-        location_matrix[index] = distances
-
-    # Convert the dictionary to a dataframe
-    location_df = pd.DataFrame.from_dict(location_matrix, orient='index')
-    location_df.index = df.PropertyName
-
-    return location_df.fillna(54000)
-
-
-def get_cosine_sim3(logger: logging):
-    location_df = get_location_df(logger)
+    location_df = pd.DataFrame(location_matrix, index=df.PropertyName, columns=locations)
+
+    return location_df.fillna(54000), groups
+
+
+def get_location_df(logger: logging, groups_path: str = None):
+    location_df, groups = _location_df_and_groups(logger, groups_path)
+    # Outside the memoized part, a cache hit still writes the groups file
+    if groups_path is not None:
+        save_location_groups(groups, groups_path)
+    return location_df
 
+
+def get_location_features(location_df: pd.DataFrame):
     # Initialize the scaler
     scaler = StandardScaler()
 
     # Apply the scaler to the entire dataframe
     location_df_normalized = pd.DataFrame(scaler.fit_transform(location_df), columns=location_df.columns, index=location_df.index)
 
+    return location_df_normalized
+
+
+def get_cosine_sim3(logger: logging, groups_path: str = None):
+    location_df = get_location_df(logger, groups_path)
+    location_df_normalized = get_location_features(location_df)
+
     cosine_sim3 = cosine_similarity(location_df_normalized)
 
     return location_df, cosine_sim3
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+import logging
+
+from scipy import sparse
+
+from src.models.recommender import ann
+
+# Weights used by the Recommend Apartments page for
+# (facilities, price details, location advantages)
+DEFAULT_WEIGHTS = (0.5, 0.8, 1.0)
+
+
+class FactorSimilarity:
+    """Similarity source backed by unit-norm feature rows.
+
+    Indexing returns similarity rows like a dense N x N matrix would, but
+    each one is computed as a single (sparse) matrix-vector product, so
+    only the O(N * nnz) factors have to be stored.
+    """
+
+    def __init__(self, factors):
+        self.factors = factors
+        self.shape = (factors.shape[0], factors.shape[0])
+        if sparse.issparse(factors):
+            self._transposed = factors.T.tocsr()
+        else:
+            self._transposed = factors.T
+
+    def __getitem__(self, rows):
+        block = self.factors[rows] @ self._transposed
+        if sparse.issparse(block):
+            block = block.toarray()
+        block = np.asarray(block)
+        if isinstance(rows, (int, np.integer)) and block.ndim == 2:
+            return block[0]
+        return block
+
+
+def blend_rows(sims, weights, rows) -> np.ndarray:
+    # Weighted sum of the selected rows only, never the full N x N matrix
+    blended = None
+    for sim, weight in zip(sims, weights):
+        part = weight * np.asarray(sim[rows], dtype=np.float64)
+        blended = part if blended is None else blended + part
+    return blended
+
+
+def top_k(scores: np.ndarray, k: int):
+    # Indices and scores of the k largest entries of each row, best first.
+    # Ties keep the lower index first, like the stable sort used before.
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.lexsort((part, -part_scores), axis=1)
+    indices = np.take_along_axis(part, order, axis=1)
+    return indices, np.take_along_axis(part_scores, order, axis=1)
+
+
+def build_topk_index(
+    sims, weights, k: int, logger: logging, block_size: int = 1024
+) -> dict:
+    logger.debug("Building top-%d index for weights %s", k, weights)
+    n = sims[0].shape[0]
+    # The best match of a property is normally itself, keep one extra slot
+    width = min(k + 1, n)
+    indices = np.empty((n, width), dtype=np.int32)
+    scores = np.empty((n, width), dtype=np.float32)
+
+    for start in range(0, n, block_size):
+        rows = slice(start, min(start + block_size, n))
+        indices[rows], scores[rows] = top_k(blend_rows(sims, weights, rows), width)
+
+    return {
+        "indices": indices,
+        "scores": scores,
+        "weights": np.asarray(weights, dtype=np.float64),
+    }
+
+
+def save_topk_index(index: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving top-k index to %s", file_path)
+    np.savez(file_path, **index)
+
+
+def load_topk_index(file_path: str) -> dict:
+    with np.load(file_path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def _weights_match(index, weights) -> bool:
+    return (
+        index is not None
+        and len(index["weights"]) == len(weights)
+        and np.allclose(index["weights"], weights)
+    )
+
+
+def _index_covers(index, weights, top_n) -> bool:
+    return _weights_match(index, weights) and index["indices"].shape[1] > top_n
+
+
+def recommend(
+    sims,
+    names: pd.Index,
+    property_name: str,
+    top_n: int = 5,
+    weights=DEFAULT_WEIGHTS,
+    index: dict = None,
+    ann_index: dict = None,
+    n_probe: int = 8,
+    backend: str = "exact",
+) -> pd.DataFrame:
+    row = names.get_loc(property_name)
+
+    if backend == "ann" and _weights_match(ann_index, weights):
+        # Approximate search over the probed IVF lists only
+        indices, scores = ann.search_row(ann_index, row, top_n + 1, n_probe)
+    elif _index_covers(index, weights, top_n):
+        # O(k) lookup in the precomputed neighbour lists
+        indices = index["indices"][row]
+        scores = index["scores"][row]
+    elif _weights_match(ann_index, weights):
+        # Approximate search over the probed IVF lists only
+        indices, scores = ann.search_row(ann_index, row, top_n + 1, n_probe)
+    else:
+        # Blend a single row on demand
+        indices, scores = top_k(blend_rows(sims, weights, row), top_n + 1)
+        indices, scores = indices[0], scores[0]
+
+    # Skip the best match, which is the property itself
+    return pd.DataFrame(
+        {
+            "PropertyName": names[indices[1 : top_n + 1]].tolist(),
+            "SimilarityScore": scores[1 : top_n + 1].tolist(),
+        }
+    )
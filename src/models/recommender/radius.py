@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+import logging
+
+
+def build_radius_index(location_df: pd.DataFrame, logger: logging) -> dict:
+    # For every location column, the properties sorted by distance to it
+    logger.debug("Building radius index for %d locations", location_df.shape[1])
+    distances = location_df.to_numpy(dtype=np.float32).T
+    order = np.argsort(distances, axis=1, kind="stable").astype(np.int32)
+
+    return {
+        "locations": np.asarray(location_df.columns, dtype=str),
+        "order": order,
+        "distances": np.take_along_axis(distances, order, axis=1),
+    }
+
+
+def save_radius_index(index: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving radius index to %s", file_path)
+    np.savez(file_path, **index)
+
+
+def load_radius_index(file_path: str) -> dict:
+    with np.load(file_path) as data:
+        index = {key: data[key] for key in data.files}
+    index["positions"] = {name: i for i, name in enumerate(index["locations"])}
+
+    # Inverse permutation: where each row sits in every location's order
+    n_locations, n_rows = index["order"].shape
+    index["ranks"] = np.empty_like(index["order"])
+    np.put_along_axis(
+        index["ranks"],
+        index["order"],
+        np.broadcast_to(np.arange(n_rows, dtype=np.int32), (n_locations, n_rows)),
+        axis=1,
+    )
+    return index
+
+
+def within_radius(index: dict, location: str, radius: float):
+    # Rows strictly closer than `radius` meters, nearest first
+    i = index["positions"][location]
+    count = np.searchsorted(index["distances"][i], radius, side="left")
+    return index["order"][i, :count], index["distances"][i, :count]
+
+
+def within_radii(index: dict, radii: dict):
+    # Rows inside every (location -> radius in meters) constraint, ordered by
+    # distance to the first location. Returns the rows and an array with one
+    # column of distances per location.
+    locations = list(radii)
+    rows, _ = within_radius(index, locations[0], radii[locations[0]])
+    for location in locations[1:]:
+        inside, _ = within_radius(index, location, radii[location])
+        rows = rows[np.isin(rows, inside)]
+
+    columns = np.array([index["positions"][location] for location in locations])
+    ranks = index["ranks"][np.ix_(columns, rows)]
+    return rows, index["distances"][columns[:, None], ranks].T
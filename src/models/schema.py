@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+import json
+import logging
+
+# The 12 inputs collected by the Price Predictor page, in training order
+FEATURE_COLUMNS = [
+    "property_type",
+    "sector",
+    "bedRoom",
+    "bathroom",
+    "balcony",
+    "agePossession",
+    "built_up_area",
+    "servant room",
+    "store room",
+    "furnishing_type",
+    "luxury_category",
+    "floor_category",
+]
+
+# Numeric columns with at most this many distinct values also keep the list
+# of values, so they can be offered as a selectbox
+MAX_DISCRETE_VALUES = 50
+
+
+def _python(value):
+    # numpy scalars are not JSON serialisable
+    return value.item() if hasattr(value, "item") else value
+
+
+def build_input_schema(X: pd.DataFrame, logger: logging) -> dict:
+    # Everything an input form needs to know about the training features,
+    # without keeping the training frame around
+    logger.debug("Building input schema for %d columns", X.shape[1])
+    schema = {"columns": X.columns.tolist(), "categorical": {}, "numeric": {}}
+
+    for column in X.columns:
+        values = X[column].dropna()
+        if pd.api.types.is_numeric_dtype(values):
+            entry = {
+                "dtype": str(values.dtype),
+                "min": _python(values.min()),
+                "max": _python(values.max()),
+                "default": _python(values.median()),
+            }
+            distinct = values.unique()
+            if len(distinct) <= MAX_DISCRETE_VALUES:
+                entry["values"] = sorted(_python(value) for value in distinct)
+            schema["numeric"][column] = entry
+        else:
+            # Categories in order of first appearance, like Series.unique()
+            schema["categorical"][column] = {
+                "categories": [_python(value) for value in values.unique()],
+                "default": _python(values.mode().iloc[0]),
+            }
+
+    return schema
+
+
+def save_input_schema(schema: dict, file_path: str, logger: logging) -> None:
+    logger.debug("Saving input schema to %s", file_path)
+    with open(file_path, "w") as f:
+        json.dump(schema, f, indent=2)
+
+
+def load_input_schema(file_path: str) -> dict:
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+
+def input_dtypes(schema: dict) -> dict:
+    # Column dtypes to read model inputs with, so every chunk of a file gets
+    # the types the model was trained on whatever values it happens to hold
+    # Numbers as float64, an int64 column cannot hold missing values
+    dtype = {column: str for column in schema["categorical"]}
+    dtype.update({column: np.float64 for column in schema["numeric"]})
+    return dtype
+
+
+class SchemaAccumulator:
+    """build_input_schema for data seen in chunks.
+
+    Keeps the value counts of every column, which is enough for the same
+    categories, bounds, defaults and value lists as the in-memory version.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.dtypes = {}
+        self.kinds = {}
+        self.counts = {}
+        # Columns with missing values, which the counts leave out
+        self.missing = set()
+
+    def update(self, X: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = X.columns.tolist()
+        for column in self.columns:
+            values = X[column].dropna()
+            if len(values) < len(X):
+                self.missing.add(column)
+            self.kinds.setdefault(column, set()).add(
+                pd.api.types.is_numeric_dtype(values.dtype)
+            )
+            dtype = self.dtypes.get(column)
+            self.dtypes[column] = (
+                values.dtype if dtype is None else np.result_type(dtype, values.dtype)
+            )
+            counts = self.counts.setdefault(column, {})
+            # Dict insertion order keeps the order of first appearance
+            for value, count in values.value_counts(sort=False).items():
+                counts[value] = counts.get(value, 0) + count
+
+    def mixed_columns(self) -> list:
+        # Columns parsed as numbers in some chunks and as text in others
+        return [column for column in self.columns if len(self.kinds[column]) > 1]
+
+    @staticmethod
+    def _median(counts: dict):
+        values = sorted(counts)
+        cumulative = np.cumsum([counts[value] for value in values])
+        n = cumulative[-1]
+        lower = values[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+        upper = values[np.searchsorted(cumulative, n // 2, side="right")]
+        return (lower + upper) / 2
+
+    def result(self) -> dict:
+        schema = {"columns": list(self.columns), "categorical": {}, "numeric": {}}
+        for column in self.columns:
+            counts = self.counts[column]
+            if pd.api.types.is_numeric_dtype(self.dtypes[column]):
+                entry = {
+                    "dtype": str(self.dtypes[column]),
+                    "min": _python(min(counts)),
+                    "max": _python(max(counts)),
+                    "default": _python(np.float64(self._median(counts))),
+                }
+                if len(counts) <= MAX_DISCRETE_VALUES:
+                    entry["values"] = sorted(_python(value) for value in counts)
+                schema["numeric"][column] = entry
+            else:
+                # Series.mode() breaks ties by taking the smallest value
+                top = max(counts.values())
+                schema["categorical"][column] = {
+                    "categories": [_python(value) for value in counts],
+                    "default": _python(
+                        min(value for value, count in counts.items() if count == top)
+                    ),
+                }
+        return schema
@@ -0,0 +1,426 @@
+import pandas as pd
+
+import os
+import json
+import time
+import pickle
+import asyncio
+import hashlib
+import argparse
+import logging
+
+from src.models import forest, frozen, predict, prediction_cache, schema
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="serve.log")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def file_signatures(*paths) -> tuple:
+    # mtime and size of every file that exists, to spot a new model
+    signatures = []
+    for path in paths:
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            signatures.append((stat.st_mtime_ns, stat.st_size))
+        else:
+            signatures.append(None)
+    return tuple(signatures)
+
+
+def load_models(
+    model_path: str, forest_path: str = None, preprocessor_path: str = None
+) -> dict:
+    signatures = file_signatures(model_path, forest_path, preprocessor_path)
+    # Unpickled from the bytes that are hashed, so the hash names the model
+    # actually loaded even if the file is replaced meanwhile
+    with open(model_path, "rb") as f:
+        data = f.read()
+    models = {
+        "pipeline": pickle.loads(data),
+        "model_hash": hashlib.sha256(data).hexdigest(),
+        "flat_forest": None,
+        "preprocessor": None,
+        "signatures": signatures,
+    }
+    if forest_path and os.path.exists(forest_path):
+        models["flat_forest"] = forest.load_forest(forest_path)
+    if preprocessor_path and os.path.exists(preprocessor_path):
+        models["preprocessor"] = frozen.load_frozen_preprocessor(preprocessor_path)
+    return models
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row requests into one predict call.
+
+    A batch is sent as soon as it holds `max_batch_size` rows or the oldest
+    row has waited `max_wait_ms`, whichever comes first. The model files are
+    checked before every batch, and every `reload_seconds` while idle, and
+    reloaded when they changed. The cache is pinned to the loaded model.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        forest_path: str = None,
+        preprocessor_path: str = None,
+        cache: prediction_cache.PredictionCache = None,
+        input_schema: dict = None,
+        reload_seconds: float = 5.0,
+    ):
+        self.model_paths = (model_path, forest_path, preprocessor_path)
+        self.models = load_models(*self.model_paths)
+        # Requests are checked against it before they join a batch
+        self.input_schema = input_schema
+        self.cache = cache
+        if cache is not None:
+            cache.pin(self.models["model_hash"])
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.reload_seconds = reload_seconds
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.reloads = 0
+
+    async def submit(self, row: dict) -> dict:
+        # Cache hits skip the batching wait altogether
+        if self.cache is not None:
+            result = self.cache.lookup(row)
+            if result is not None:
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def _collect(self) -> list:
+        # Empty when nothing arrived for reload_seconds
+        try:
+            batch = [await asyncio.wait_for(self.queue.get(), self.reload_seconds)]
+        except asyncio.TimeoutError:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def refresh(self) -> bool:
+        # Runs in the executor between batches, never alongside _predict
+        if file_signatures(*self.model_paths) == self.models["signatures"]:
+            return False
+        models = load_models(*self.model_paths)
+        self.models = models
+        if self.cache is not None:
+            self.cache.pin(models["model_hash"])
+        self.reloads += 1
+        logger.info("Reloaded model %s", models["model_hash"][:12])
+        return True
+
+    def _predict(self, rows: list) -> list:
+        df = pd.DataFrame(rows, columns=predict.FEATURE_COLUMNS)
+        models = self.models
+
+        def predict_fn(batch):
+            return predict.predict_prices(
+                models["pipeline"],
+                batch,
+                models["flat_forest"],
+                models["preprocessor"],
+            )
+
+        if self.cache is None:
+            result = predict_fn(df)
+        else:
+            result = self.cache.predict(df, predict_fn)
+        return result[prediction_cache.RESULT_COLUMNS].to_dict("records")
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                # A file caught mid-write, the old model serves until the next try
+                logger.error(f"Error reloading model: {e}")
+            if not batch:
+                continue
+
+            rows = [row for row, _ in batch]
+            try:
+                # Off the event loop, so requests keep queueing meanwhile
+                results = await loop.run_in_executor(None, self._predict, rows)
+            except Exception as e:
+                # One bad row must not fail the rows batched with it, the
+                # batch is retried row by row
+                if len(batch) == 1:
+                    results = [e]
+                else:
+                    results = [await self._predict_one(loop, row) for row in rows]
+
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _predict_one(self, loop, row: dict):
+        try:
+            return (await loop.run_in_executor(None, self._predict, [row]))[0]
+        except Exception as e:
+            return e
+
+    def stats(self) -> dict:
+        stats = {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+            "reloads": self.reloads,
+            "model_hash": self.models["model_hash"],
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+
+def validate(payload, input_schema: dict = None) -> dict:
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object")
+    missing = [column for column in predict.FEATURE_COLUMNS if column not in payload]
+    if missing:
+        raise ValueError(f"Missing fields: {missing}")
+    row = {column: payload[column] for column in predict.FEATURE_COLUMNS}
+    if input_schema is None:
+        return row
+
+    # The encoders reject categories they were not fitted on
+    for column, entry in input_schema["categorical"].items():
+        if column in row and row[column] not in entry["categories"]:
+            raise ValueError(f"Unknown {column}: {row[column]!r}")
+    for column in input_schema["numeric"]:
+        if column in row:
+            value = row[column]
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{column} must be a number, got {value!r}")
+            try:
+                row[column] = float(value)
+            except ValueError:
+                raise ValueError(f"{column} must be a number, got {value!r}")
+    return row
+
+
+async def read_request(reader: asyncio.StreamReader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, version = request_line.decode("latin-1").split()
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+
+    keep_alive = (
+        headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+    )
+    return method, path, body, keep_alive
+
+
+def write_response(
+    writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool
+):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+
+
+async def handle(batcher: MicroBatcher, method: str, path: str, body: bytes):
+    if path == "/health":
+        return 200, {"status": "ok"}
+    if path == "/stats":
+        return 200, batcher.stats()
+    if path != "/predict":
+        return 404, {"error": f"Unknown path {path}"}
+    if method != "POST":
+        return 405, {"error": "Use POST"}
+
+    try:
+        row = validate(json.loads(body), batcher.input_schema)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    return 200, await batcher.submit(row)
+
+
+def make_handler(batcher: MicroBatcher, logger: logging):
+    async def serve_connection(reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                try:
+                    status, payload = await handle(batcher, method, path, body)
+                except Exception as e:
+                    logger.error(f"Error : {e}")
+                    status, payload, keep_alive = 400, {"error": str(e)}, False
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return serve_connection
+
+
+async def serve(
+    model_path: str,
+    logger: logging,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_batch_size: int = 64,
+    max_wait_ms: float = 5.0,
+    forest_path: str = None,
+    preprocessor_path: str = None,
+    cache_params: dict = None,
+    schema_path: str = None,
+    reload_seconds: float = 5.0,
+) -> None:
+    logger.info("Loading model from %s", model_path)
+    if forest_path and os.path.exists(forest_path):
+        logger.info("Using flattened forest from %s", forest_path)
+    if preprocessor_path and os.path.exists(preprocessor_path):
+        logger.info("Using frozen preprocessor from %s", preprocessor_path)
+    input_schema = None
+    if schema_path and os.path.exists(schema_path):
+        logger.info("Validating requests against %s", schema_path)
+        input_schema = schema.load_input_schema(schema_path)
+    cache = None
+    if cache_params and cache_params.get("max_size"):
+        cache = prediction_cache.get_cache(model_path, **cache_params)
+    batcher = MicroBatcher(
+        model_path,
+        max_batch_size,
+        max_wait_ms,
+        forest_path,
+        preprocessor_path,
+        cache,
+        input_schema,
+        reload_seconds,
+    )
+    batch_task = asyncio.create_task(batcher.run())
+
+    server = await asyncio.start_server(make_handler(batcher, logger), host, port)
+    logger.info(
+        "Serving on http://%s:%d/predict (max batch %d, max wait %.1f ms)",
+        host,
+        port,
+        max_batch_size,
+        max_wait_ms,
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+if __name__ == "__main__":
+    params = utils.load_params("params.yaml", "serve", logger)
+    cache_params = utils.load_params("params.yaml", "prediction_cache", logger)
+
+    parser = argparse.ArgumentParser(description="Price prediction HTTP server")
+    parser.add_argument(
+        "--model", default=os.path.join("models", "real_estate_predictor.pkl")
+    )
+    parser.add_argument(
+        "--forest",
+        default=os.path.join("models", "forest.npz"),
+        help="flattened forest to predict with, if the file exists",
+    )
+    parser.add_argument(
+        "--preprocessor",
+        default=os.path.join("models", "preprocessor.json"),
+        help="frozen preprocessor to transform with, if the file exists",
+    )
+    parser.add_argument(
+        "--schema",
+        default=os.path.join("models", "input_schema.json"),
+        help="input schema to validate requests with, if the file exists",
+    )
+    parser.add_argument("--host", default=params.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=params.get("port", 8000))
+    parser.add_argument(
+        "--max-batch-size", type=int, default=params.get("max_batch_size", 64)
+    )
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=params.get("max_wait_ms", 5.0)
+    )
+    parser.add_argument(
+        "--reload-seconds",
+        type=float,
+        default=params.get("reload_seconds", 5.0),
+        help="how often an idle server checks the model files for changes",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=cache_params.get("max_size", 10000),
+        help="distinct inputs to keep, 0 to disable the prediction cache",
+    )
+    args = parser.parse_args()
+    cache_params["max_size"] = args.cache_size
+
+    try:
+        asyncio.run(
+            serve(
+                args.model,
+                logger,
+                host=args.host,
+                port=args.port,
+                max_batch_size=args.max_batch_size,
+                max_wait_ms=args.max_wait_ms,
+                forest_path=args.forest,
+                preprocessor_path=args.preprocessor,
+                cache_params=cache_params,
+                schema_path=args.schema,
+                reload_seconds=args.reload_seconds,
+            )
+        )
+
+    except KeyboardInterrupt:
+        logger.info("Server stopped")
+    except Exception as e:
+        logger.error(f"Error : {e}")
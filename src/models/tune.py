@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+import os
+import time
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+from dvclive import Live
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+
+import src.utils as utils
+from src.models import design_cache
+from src.models.model_building import build_model, build_preprocessor
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="tune.log")
+
+FOLD_ARRAYS = ("X_train", "y_train", "X_val", "y_val")
+
+# Set in each worker process by _init_worker
+_folds = None
+_models = {}
+
+
+def fold_cache_key(file_path: str, cv: int, random_state: int) -> str:
+    # Data, split and preprocessor configuration all change the matrices
+    return design_cache.cache_key(
+        build_preprocessor(), design_cache.file_hash(file_path), cv, random_state
+    )
+
+
+def prepare_folds(
+    file_path: str, cv: int, random_state: int, cache_dir: str, logger: logging
+) -> list:
+    # Fit the preprocessor once per fold and keep the design matrices on
+    # disk, so trials (and later runs on the same data) only fit forests
+    fold_dir = os.path.join(cache_dir, fold_cache_key(file_path, cv, random_state))
+    fold_paths = [os.path.join(fold_dir, f"fold_{i}") for i in range(cv)]
+    if design_cache.is_complete(fold_dir) and all(
+        design_cache.is_complete(path, FOLD_ARRAYS) for path in fold_paths
+    ):
+        logger.info("Reusing cached folds from %s", fold_dir)
+        design_cache.touch(fold_dir)
+        return fold_paths
+
+    df = utils.load_data(file_path, logger)
+    if df.empty:
+        raise ValueError("Data loading failed: Empty DataFrame")
+
+    logger.info("Preparing %d folds in %s", cv, fold_dir)
+    X = df.drop(columns=["price"])
+    y = np.log1p(df["price"])
+    splitter = KFold(n_splits=cv, shuffle=True, random_state=random_state)
+    for path, (train_rows, val_rows) in zip(fold_paths, splitter.split(X)):
+        preprocessor = build_preprocessor()
+        arrays = {
+            "X_train": preprocessor.fit_transform(
+                X.iloc[train_rows], y.iloc[train_rows]
+            ),
+            "y_train": y.iloc[train_rows].to_numpy(),
+            "X_val": preprocessor.transform(X.iloc[val_rows]),
+            "y_val": df["price"].iloc[val_rows].to_numpy(),
+        }
+        design_cache.save_arrays(
+            path,
+            {name: np.asarray(a, dtype=np.float64) for name, a in arrays.items()},
+            logger,
+        )
+    # Marks the whole set of folds as complete
+    design_cache.save_arrays(
+        fold_dir, {}, logger, meta={"cv": cv, "random_state": random_state}
+    )
+    return fold_paths
+
+
+def _init_worker(fold_paths: list) -> None:
+    global _folds
+    _folds = [design_cache.load_arrays(path, FOLD_ARRAYS) for path in fold_paths]
+
+
+def _run_trial(trial: int, params: dict, random_state: int, warm: bool) -> dict:
+    # Cross-validated scores of one configuration. With `warm`, the fold
+    # models are kept so a later call with more trees only fits the new ones
+    start = time.perf_counter()
+    maes, r2s = [], []
+    for i, fold in enumerate(_folds):
+        model = _models.get((trial, i)) if warm else None
+        if model is None:
+            model = build_model(params, random_state=random_state, warm_start=warm)
+        else:
+            model.set_params(n_estimators=params["n_estimators"])
+        model.fit(fold["X_train"], fold["y_train"])
+        if warm:
+            _models[(trial, i)] = model
+
+        y_pred = np.expm1(model.predict(fold["X_val"]))
+        maes.append(mean_absolute_error(fold["y_val"], y_pred))
+        r2s.append(r2_score(fold["y_val"], y_pred))
+
+    return {
+        "trial": trial,
+        **params,
+        "mae": float(np.mean(maes)),
+        "mae_std": float(np.std(maes)),
+        "r2": float(np.mean(r2s)),
+        "fit_seconds": time.perf_counter() - start,
+    }
+
+
+def _forget(trials: list) -> None:
+    for key in [key for key in _models if key[0] in trials]:
+        del _models[key]
+
+
+class TrialRunner:
+    """One single-process pool per worker, trial t always runs on pool
+    t % n_jobs so warm-started models stay in the process that built them"""
+
+    def __init__(self, fold_paths: list, n_jobs: int, random_state: int):
+        self.random_state = random_state
+        self.pools = [
+            ProcessPoolExecutor(
+                max_workers=1, initializer=_init_worker, initargs=(fold_paths,)
+            )
+            for _ in range(n_jobs)
+        ]
+
+    def run(self, trials: list, warm: bool = False) -> list:
+        futures = [
+            self.pools[trial % len(self.pools)].submit(
+                _run_trial, trial, params, self.random_state, warm
+            )
+            for trial, params in trials
+        ]
+        return [future.result() for future in futures]
+
+    def forget(self, trials: list) -> None:
+        for pool in self.pools:
+            pool.submit(_forget, trials).result()
+
+    def close(self) -> None:
+        for pool in self.pools:
+            pool.shutdown()
+
+
+def search(
+    runner: TrialRunner, params: dict, live: Live, logger: logging
+) -> pd.DataFrame:
+    method = params.get("method", "random")
+    space = params["space"]
+    random_state = params.get("random_state", 42)
+    results = []
+
+    def record(rung_results: list, rung: int) -> None:
+        for result in rung_results:
+            result["rung"] = rung
+            logger.debug("Trial %s", result)
+            live.log_metric("mae", result["mae"])
+            live.log_metric("r2", result["r2"])
+            live.log_metric("n_estimators", result["n_estimators"])
+            live.next_step()
+        results.extend(rung_results)
+
+    if method == "grid":
+        candidates = list(ParameterGrid(space))
+        record(runner.run(list(enumerate(candidates))), 0)
+    elif method == "random":
+        candidates = list(
+            ParameterSampler(
+                space, params.get("n_trials", 20), random_state=random_state
+            )
+        )
+        record(runner.run(list(enumerate(candidates))), 0)
+    elif method == "halving":
+        # Successive halving with the number of trees as the resource. The
+        # survivors of each rung grow their existing forests by warm start.
+        halving = params.get("halving", {})
+        factor = halving.get("factor", 3)
+        max_estimators = halving.get("max_estimators", max(space["n_estimators"]))
+        n_estimators = halving.get("min_estimators", 30)
+        reduced = {key: value for key, value in space.items() if key != "n_estimators"}
+        candidates = list(
+            ParameterSampler(
+                reduced, params.get("n_trials", 27), random_state=random_state
+            )
+        )
+
+        alive, rung = list(range(len(candidates))), 0
+        while True:
+            logger.info(
+                "Rung %d: %d candidates with %d trees", rung, len(alive), n_estimators
+            )
+            trials = [
+                (trial, {**candidates[trial], "n_estimators": n_estimators})
+                for trial in alive
+            ]
+            rung_results = runner.run(trials, warm=True)
+            record(rung_results, rung)
+            if n_estimators >= max_estimators:
+                break
+
+            ranked = sorted(rung_results, key=lambda result: result["mae"])
+            keep = max(1, len(alive) // factor)
+            runner.forget([result["trial"] for result in ranked[keep:]])
+            alive = [result["trial"] for result in ranked[:keep]]
+            n_estimators = min(n_estimators * factor, max_estimators)
+            rung += 1
+    else:
+        raise ValueError(f"Unknown search method {method!r}")
+
+    return pd.DataFrame(results)
+
+
+def best_params(results: pd.DataFrame) -> dict:
+    # Best configuration among those trained with the most trees, in the
+    # types params.yaml uses
+    final = results[results["rung"] == results["rung"].max()]
+    best = final.sort_values("mae").iloc[0]
+    params = {}
+    for key in ("n_estimators", "max_depth", "max_samples", "max_features"):
+        value = best[key]
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            value = None
+        elif isinstance(value, (np.integer, np.floating)):
+            value = value.item()
+        if key in ("n_estimators", "max_depth") and value is not None:
+            value = int(value)
+        params[key] = value
+    return params
+
+
+if __name__ == "__main__":
+    try:
+        params = utils.load_params("params.yaml", "tune", logger)
+
+        random_state = params.get("random_state", 42)
+        cache_dir = os.path.join("data", "interim", "tune_cache")
+        fold_paths = prepare_folds(
+            os.path.join(
+                "data",
+                "processed",
+                utils.data_file("train", utils.get_data_format(logger)),
+            ),
+            params.get("cv", 5),
+            random_state,
+            cache_dir,
+            logger,
+        )
+        design_cache.prune(cache_dir, params.get("cache_entries", 3), logger)
+
+        runner = TrialRunner(fold_paths, params.get("n_jobs", 1), random_state)
+        try:
+            with Live("dvclive_tune") as live:
+                results = search(runner, params, live, logger)
+                best = best_params(results)
+                live.log_params({f"best.{key}": value for key, value in best.items()})
+        finally:
+            runner.close()
+
+        model_path = os.path.join("models")
+        results.to_csv(os.path.join(model_path, "tune_trials.csv"), index=False)
+        with open(os.path.join(model_path, "best_params.yaml"), "w") as f:
+            yaml.safe_dump({"model_building": best}, f, sort_keys=False)
+        logger.info("Best params: %s", best)
+
+    except Exception as e:
+        logger.error(f"Error : {e}")
@@ -0,0 +1,259 @@
+import pandas as pd
+
+import io
+import os
+import time
+import argparse
+import logging
+
+import src.utils as utils
+from src.data.preprocessing_flats import preprocess_flats
+from src.data.preprocessing_houses import preprocess_houses
+from src.data.merge_flats_and_houses import merge_flats_and_houses
+from src.data.preprocessing_level_2 import preprocess_level_2
+from src.features.feature_engineering import engineer_features
+from src.features.outlier_treatment import treat_outliers
+from src.features.missing_value_imputation import impute_missing_values
+from src.features.feature_selection import select_features
+from src.features.split_data import split_data
+from src.models.model_building import train_model
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="runner.log")
+
+# Raw inputs, always CSV
+SOURCES = {
+    "raw_flats": os.path.join("data", "raw", "flats.csv"),
+    "raw_houses": os.path.join("data", "raw", "houses.csv"),
+}
+
+# Folder of every dataset a stage hands to the next, as in dvc.yaml
+DATASETS = {
+    "flats": "interim",
+    "houses": "interim",
+    "gurgaon_properties": "interim",
+    "gurgaon_properties_cleaned_v1": "interim",
+    "gurgaon_properties_cleaned_v2": "interim",
+    "gurgaon_properties_outlier_treated": "interim",
+    "gurgaon_properties_missing_value_imputation": "interim",
+    "gurgaon_properties_post_feature_selection": "processed",
+    "train": "processed",
+    "test": "processed",
+}
+
+# The dvc.yaml stages up to training in dependency order: function,
+# datasets it reads, datasets it returns and its params section
+STAGES = {
+    "preprocessing_flats": (preprocess_flats, ["raw_flats"], ["flats"], None),
+    "preprocessing_houses": (preprocess_houses, ["raw_houses"], ["houses"], None),
+    "merge_flats_and_houses": (
+        merge_flats_and_houses,
+        ["flats", "houses"],
+        ["gurgaon_properties"],
+        None,
+    ),
+    "preprocessing_level_2": (
+        preprocess_level_2,
+        ["gurgaon_properties"],
+        ["gurgaon_properties_cleaned_v1"],
+        None,
+    ),
+    "feature_engineering": (
+        engineer_features,
+        ["gurgaon_properties_cleaned_v1"],
+        ["gurgaon_properties_cleaned_v2"],
+        None,
+    ),
+    "outlier_treatment": (
+        treat_outliers,
+        ["gurgaon_properties_cleaned_v2"],
+        ["gurgaon_properties_outlier_treated"],
+        None,
+    ),
+    "missing_value_imputation": (
+        impute_missing_values,
+        ["gurgaon_properties_outlier_treated"],
+        ["gurgaon_properties_missing_value_imputation"],
+        None,
+    ),
+    "feature_selection": (
+        select_features,
+        ["gurgaon_properties_missing_value_imputation"],
+        ["gurgaon_properties_post_feature_selection"],
+        None,
+    ),
+    "split_data": (
+        split_data,
+        ["gurgaon_properties_post_feature_selection"],
+        ["train", "test"],
+        "split_data",
+    ),
+    # Writes the model artifacts, no datasets
+    "model_building": (train_model, ["train"], [], "model_building"),
+}
+
+
+def dataset_path(name: str, data_format: str) -> str:
+    if name in SOURCES:
+        return SOURCES[name]
+    return os.path.join("data", DATASETS[name], utils.data_file(name, data_format))
+
+
+def checkpoint_names(checkpoints) -> set:
+    # `all`, or a list of dataset names
+    if checkpoints == "all":
+        return set(DATASETS)
+    unknown = set(checkpoints) - set(DATASETS)
+    if unknown:
+        raise ValueError(f"Unknown checkpoint datasets: {', '.join(sorted(unknown))}")
+    return set(checkpoints)
+
+
+def _reload(data: pd.DataFrame, data_format: str) -> pd.DataFrame:
+    # Real save/load round trip through a buffer, to check utils.as_loaded
+    buffer = io.BytesIO()
+    if data_format == "parquet":
+        utils._csv_dtypes(data).to_parquet(buffer, index=False)
+        buffer.seek(0)
+        return pd.read_parquet(buffer)
+    data.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+
+def run_pipeline(
+    params: dict,
+    logger: logging,
+    checkpoints=(),
+    stages: list = None,
+    verify: bool = False,
+) -> pd.DataFrame:
+    """Run the registered stages in one process.
+
+    Outputs are handed to the next stage in memory, as utils.as_loaded
+    returns them, and written to their DVC paths only when listed in
+    `checkpoints`. Inputs of a partial run are read from those paths.
+    Returns the timing of every stage.
+    """
+    data_format = params.get("data", {}).get("format", "csv")
+    checkpoints = checkpoint_names(checkpoints)
+    stages = list(STAGES) if stages is None else stages
+
+    # Drop every dataset after its last reader
+    last_read = {}
+    for stage in stages:
+        for name in STAGES[stage][1]:
+            last_read[name] = stage
+
+    frames, timings = {}, []
+    for stage in stages:
+        function, inputs, outputs, section = STAGES[stage]
+        start = time.perf_counter()
+        for name in inputs:
+            if name not in frames:
+                path = dataset_path(name, data_format)
+                logger.info("Reading %s", path)
+                frames[name] = utils.load_data(path, logger)
+                if frames[name].empty:
+                    raise ValueError(f"Data loading failed: Empty DataFrame {path}")
+        read_s = time.perf_counter() - start
+
+        logger.info("Running %s", stage)
+        args = [frames[name] for name in inputs]
+        if section:
+            args.append(params.get(section, {}))
+        start = time.perf_counter()
+        result = function(*args)
+        run_s = time.perf_counter() - start
+        results = dict(zip(outputs, result if len(outputs) > 1 else [result]))
+        for name, data in results.items():
+            if data.empty:
+                raise ValueError(f"{stage} returned an empty {name}")
+
+        start = time.perf_counter()
+        for name in outputs:
+            if name in checkpoints:
+                path = dataset_path(name, data_format)
+                utils.save_data(
+                    results[name], os.path.dirname(path), os.path.basename(path), logger
+                )
+        write_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name in outputs:
+            frames[name] = utils.as_loaded(results[name])
+        handoff_s = time.perf_counter() - start
+
+        if verify:
+            for name in outputs:
+                try:
+                    pd.testing.assert_frame_equal(
+                        frames[name], _reload(results[name], data_format)
+                    )
+                except AssertionError as e:
+                    logger.warning("%s differs from its reloaded file: %s", name, e)
+
+        for name in inputs:
+            if last_read[name] == stage:
+                del frames[name]
+        timings.append(
+            {
+                "stage": stage,
+                "rows_in": sum(len(data) for data in args[: len(inputs)]),
+                "rows_out": sum(len(data) for data in results.values()),
+                "read_s": read_s,
+                "run_s": run_s,
+                "handoff_s": handoff_s,
+                "write_s": write_s,
+            }
+        )
+        del args, result, results
+
+    timings = pd.DataFrame(timings).astype({"rows_in": "Int64", "rows_out": "Int64"})
+    timings["total_s"] = timings[["read_s", "run_s", "handoff_s", "write_s"]].sum(
+        axis=1
+    )
+    total = timings.sum(numeric_only=True)[["read_s", "run_s", "handoff_s", "write_s"]]
+    return pd.concat(
+        [timings, pd.DataFrame([{"stage": "total", **total, "total_s": total.sum()}])],
+        ignore_index=True,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline in one process")
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), help="subset to run, in order"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="compare every in-memory handoff with a real save and load",
+    )
+    parser.add_argument(
+        "--memoize",
+        action="store_true",
+        help="reuse results of the memoized functions whatever memoize.enabled"
+        " says, see utils.memoize",
+    )
+    args = parser.parse_args()
+    if args.memoize:
+        os.environ[utils.MEMO_ENV] = "1"
+
+    try:
+        params = utils.load_params("params.yaml", "all", logger)
+        runner_params = params.get("runner", {})
+        stages = (
+            None if args.stages is None else [s for s in STAGES if s in args.stages]
+        )
+        timings = run_pipeline(
+            params,
+            logger,
+            checkpoints=runner_params.get("checkpoints", ["train", "test"]),
+            stages=stages,
+            verify=args.verify,
+        )
+        print(timings.to_string(index=False, float_format="{:.3f}".format))
+
+    except Exception as e:
+        logger.error("Pipeline failed: %s", e)
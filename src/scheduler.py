@@ -0,0 +1,319 @@
+import pandas as pd
+
+import os
+import re
+import time
+import argparse
+import logging
+import resource
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import yaml
+
+import src.utils as utils
+
+# Logging configuration
+logger = utils.configure_logger(__name__, log_file="scheduler.log")
+
+# Records of the stage loggers, see utils.configure_logger. The stages catch
+# their own exceptions, so the exit code alone misses most failures
+ERROR_RECORD = re.compile(r" - ERROR - ")
+# Fields of a run_stage record kept in the report
+REPORT_FIELDS = ["stage", "status", "worker", "started", "wall_s", "cpu_s"]
+# ${section.key} references to params.yaml
+TEMPLATE = re.compile(r"\$\{([^}]+)\}")
+
+
+def _interpolate(value: str, params: dict) -> str:
+    def lookup(match):
+        node = params
+        for key in match.group(1).split("."):
+            node = node[key]
+        return str(node)
+
+    return TEMPLATE.sub(lookup, value)
+
+
+def _paths(entries: list) -> list:
+    # dvc.yaml lists paths bare or as a one-key dict of options
+    paths = []
+    for entry in entries or []:
+        paths.extend(entry if isinstance(entry, dict) else [entry])
+    return paths
+
+
+def load_stages(dvc_file: str, params: dict) -> dict:
+    # Command, deps and outs (including metrics and plots) of every stage
+    with open(dvc_file, "r") as f:
+        spec = yaml.safe_load(f)
+    stages = {}
+    for name, stage in spec.get("stages", {}).items():
+        outs = (
+            _paths(stage.get("outs"))
+            + _paths(stage.get("metrics"))
+            + _paths(stage.get("plots"))
+        )
+        stages[name] = {
+            "cmd": _interpolate(stage["cmd"], params),
+            "deps": [_interpolate(path, params) for path in _paths(stage.get("deps"))],
+            "outs": [_interpolate(path, params) for path in outs],
+            "frozen": stage.get("frozen", False),
+        }
+    return stages
+
+
+def _within(path: str, out: str) -> bool:
+    return path == out or path.startswith(out.rstrip("/") + "/")
+
+
+def build_graph(stages: dict) -> dict:
+    # Upstream stages of every stage: those producing one of its deps
+    order = list(stages)
+    upstream = {}
+    for name, stage in stages.items():
+        producers = {
+            producer
+            for dep in stage["deps"]
+            for producer, other in stages.items()
+            if producer != name and any(_within(dep, out) for out in other["outs"])
+        }
+        upstream[name] = sorted(producers, key=order.index)
+    topological_order(upstream)
+    return upstream
+
+
+def topological_order(upstream: dict) -> list:
+    order, visiting, visited = [], set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage graph has a cycle through {name!r}")
+        visiting.add(name)
+        for parent in upstream[name]:
+            visit(parent)
+        visiting.discard(name)
+        visited.add(name)
+        order.append(name)
+
+    for name in upstream:
+        visit(name)
+    return order
+
+
+def levels(upstream: dict) -> dict:
+    # Stages of the same level have no path between them
+    level = {}
+    for name in topological_order(upstream):
+        level[name] = 1 + max((level[parent] for parent in upstream[name]), default=-1)
+    return level
+
+
+def _heights(upstream: dict, stages: list) -> dict:
+    # Longest chain of downstream stages, ready stages heading the longest
+    # chains are submitted first
+    height = {name: 1 for name in stages}
+    for name in reversed(topological_order(upstream)):
+        for parent in upstream[name]:
+            if parent in height and name in height:
+                height[parent] = max(height[parent], height[name] + 1)
+    return height
+
+
+def run_stage(name: str, cmd: str) -> dict:
+    # Runs in a pool worker. A worker runs one stage at a time, so the
+    # children rusage delta is the CPU time of this stage's process
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.time()
+    start = time.perf_counter()
+    completed = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    wall_s = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_s = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    output = (completed.stdout or "") + (completed.stderr or "")
+    errors = [line for line in output.splitlines() if ERROR_RECORD.search(line)]
+    if completed.returncode and not errors:
+        errors = output.strip().splitlines()[-5:]
+    return {
+        "stage": name,
+        "status": "failed" if errors or completed.returncode else "ok",
+        "errors": errors,
+        "worker": os.getpid(),
+        "started": started,
+        "wall_s": wall_s,
+        "cpu_s": cpu_s,
+    }
+
+
+def critical_path(upstream: dict, wall: dict) -> tuple:
+    # Longest wall-time chain through the stages that ran
+    finish, previous = {}, {}
+    for name in topological_order(upstream):
+        if name not in wall:
+            continue
+        parents = [parent for parent in upstream[name] if parent in finish]
+        parent = max(parents, key=finish.get, default=None)
+        finish[name] = wall[name] + (finish[parent] if parent else 0.0)
+        previous[name] = parent
+    if not finish:
+        return [], 0.0
+    name = max(finish, key=finish.get)
+    length, path = finish[name], []
+    while name:
+        path.append(name)
+        name = previous[name]
+    return path[::-1], length
+
+
+def run_dag(
+    stages: dict, upstream: dict, n_jobs: int, logger: logging, targets: list = None
+) -> pd.DataFrame:
+    """Run the stages on a pool of `n_jobs` processes as soon as their
+    upstream stages have finished.
+
+    Upstream stages outside `targets` are assumed up to date, and frozen
+    stages only run when they are named in `targets`. A failed
+    stage skips everything downstream of it, independent stages still run.
+    Returns one row per stage with its timings and whether it lies on the
+    critical path.
+    """
+    if targets is None:
+        selected = [s for s in stages if not stages[s].get("frozen")]
+    else:
+        selected = [s for s in stages if s in targets]
+    height = _heights(upstream, selected)
+    pending, done, failed = set(selected), set(), set()
+    running, records = {}, []
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        while pending or running:
+            for name in [s for s in selected if s in pending]:
+                if any(parent in failed for parent in upstream[name]):
+                    logger.warning("Skipping %s, an upstream stage failed", name)
+                    pending.discard(name)
+                    failed.add(name)
+                    records.append({"stage": name, "status": "skipped"})
+
+            ready = [
+                name
+                for name in selected
+                if name in pending
+                and all(p in done or p not in selected for p in upstream[name])
+            ]
+            ready.sort(key=lambda name: -height[name])
+            for name in ready[: n_jobs - len(running)]:
+                logger.info("Starting %s", name)
+                pending.discard(name)
+                running[pool.submit(run_stage, name, stages[name]["cmd"])] = name
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                record = future.result()
+                if record["status"] == "ok":
+                    done.add(name)
+                    logger.info("Finished %s in %.2fs", name, record["wall_s"])
+                else:
+                    failed.add(name)
+                    logger.error(
+                        "Stage %s failed:\n%s", name, "\n".join(record["errors"])
+                    )
+                records.append(record)
+
+    report = (
+        pd.DataFrame(records, columns=REPORT_FIELDS)
+        .set_index("stage")
+        .reindex(selected)
+        .reset_index()
+        .astype({"worker": "Int64"})
+    )
+    report["start_s"] = report.pop("started") - start
+    report["end_s"] = report["start_s"] + report["wall_s"]
+    report["cpu_util"] = report["cpu_s"] / report["wall_s"]
+
+    ran = report.dropna(subset=["wall_s"])
+    path, _ = critical_path(
+        {name: [p for p in upstream[name] if p in selected] for name in upstream},
+        dict(zip(ran["stage"], ran["wall_s"])),
+    )
+    report["critical"] = report["stage"].isin(path)
+    return report[
+        [
+            "stage",
+            "status",
+            "worker",
+            "start_s",
+            "end_s",
+            "wall_s",
+            "cpu_s",
+            "cpu_util",
+            "critical",
+        ]
+    ]
+
+
+def summarize(report: pd.DataFrame) -> dict:
+    # Makespan against the serial time and the critical path, the bound no
+    # worker count can beat
+    ran = report.dropna(subset=["wall_s"])
+    makespan = float(ran["end_s"].max() - ran["start_s"].min()) if len(ran) else 0.0
+    serial = float(ran["wall_s"].sum())
+    return {
+        "makespan_s": makespan,
+        "serial_s": serial,
+        "critical_path_s": float(ran.loc[ran["critical"], "wall_s"].sum()),
+        "cpu_s": float(ran["cpu_s"].sum()),
+        # Average number of stages running at once, cpu_util of the stages
+        # tells whether they ran in parallel or just shared cores
+        "concurrency": serial / makespan if makespan else float("nan"),
+        "critical_path": " -> ".join(
+            ran.loc[ran["critical"]].sort_values("start_s")["stage"]
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the DVC stages in parallel")
+    parser.add_argument("--stages", nargs="+", help="subset to run")
+    parser.add_argument("--n-jobs", type=int, help="overrides scheduler.n_jobs")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="print the levels of the graph only"
+    )
+    args = parser.parse_args()
+
+    try:
+        params = utils.load_params("params.yaml", "all", logger)
+        stages = load_stages("dvc.yaml", params)
+        upstream = build_graph(stages)
+        unknown = set(args.stages or []) - set(stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+        if args.dry_run:
+            level = levels(upstream)
+            for depth in sorted(set(level.values())):
+                names = [
+                    f"{s} (frozen)" if stages[s]["frozen"] else s
+                    for s in stages
+                    if level[s] == depth
+                ]
+                print(f"{depth}: {', '.join(names)}")
+        else:
+            n_jobs = args.n_jobs or params.get("scheduler", {}).get("n_jobs", 2)
+            report = run_dag(stages, upstream, n_jobs, logger, args.stages)
+            print(report.to_string(index=False, float_format="{:.2f}".format))
+            for key, value in summarize(report).items():
+                print(
+                    f"{key}: {value:.2f}"
+                    if isinstance(value, float)
+                    else f"{key}: {value}"
+                )
+
+    except Exception as e:
+        logger.error("Scheduler failed: %s", e)
@@ -1,18 +1,173 @@
+import numpy as np
 import pandas as pd
 
 import os
+import pickle
+import hashlib
+import inspect
 import logging
+import functools
+import threading
 
 import yaml
+import pyarrow.parquet as pq
 
-def load_data(file_path: str, logger: logging) -> pd.DataFrame:
+# File extension of each supported data format
+DATA_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+# Results of memoized functions, see memoize. Off unless the environment
+# variable is set, so DVC stages never write the undeclared cache
+MEMO_CACHE_DIR = os.path.join("data", "interim", "memo_cache")
+MEMO_MAX_BYTES = 512 * 1024 * 1024
+MEMO_ENV = "REAL_ESTATE_MEMOIZE"
+MEMO_PARAMS = "params.yaml"
+
+
+def file_format(file_path: str) -> str:
+    # Format of a data file, from its extension
+    extension = os.path.splitext(file_path)[1].lower()
+    for name, suffix in DATA_FORMATS.items():
+        if extension == suffix:
+            return name
+    raise ValueError(f"Unsupported data file {file_path!r}")
+
+
+def data_file(stem: str, data_format: str = "csv") -> str:
+    # File name of a pipeline dataset in the configured format
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unknown data format {data_format!r}")
+    return stem + DATA_FORMATS[data_format]
+
+
+def get_data_format(logger: logging, params_filepath: str = "params.yaml") -> str:
+    # The `data.format` switch, csv unless configured
+    return load_params(params_filepath, "data", logger).get("format", "csv")
+
+
+def load_data(file_path: str, logger: logging, columns: list = None) -> pd.DataFrame:
     try:
         logger.debug("Loading data from %s", file_path)
-        return pd.read_csv(file_path)
+        if file_format(file_path) == "parquet":
+            return pd.read_parquet(file_path, columns=columns)
+        return pd.read_csv(file_path, usecols=columns)
     except Exception as e:
         logger.error("Error loading data: %s", e)
         return pd.DataFrame()
 
+
+def read_chunks(
+    file_path: str, chunk_size: int, columns: list = None, dtype: dict = None
+):
+    # Frames of at most `chunk_size` rows, `dtype` only applies to CSV
+    if file_format(file_path) == "parquet":
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            file_path, chunksize=chunk_size, usecols=columns, dtype=dtype
+        )
+
+
+# Strings read_csv parses as missing by default
+CSV_NA_VALUES = {
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+}
+CSV_BOOLEANS = {"True": True, "TRUE": True, "true": True}
+CSV_BOOLEANS.update({"False": False, "FALSE": False, "false": False})
+
+
+def _csv_text_column(column: pd.Series) -> pd.Series:
+    # _csv_column for columns of strings: every value is parsed once per
+    # distinct string instead of once per row
+    codes, uniques = pd.factorize(column)
+    uniques = pd.Series(uniques, dtype=object)
+    na_strings = uniques.isin(CSV_NA_VALUES).to_numpy()
+    missing = codes == -1
+    if na_strings.any():
+        missing |= na_strings[codes]
+    present = uniques[~na_strings]
+    if present.empty:
+        return pd.Series(np.nan, index=column.index, name=column.name)
+    if present.isin(CSV_BOOLEANS).all():
+        parsed = present.map(CSV_BOOLEANS).astype(bool)
+        # Like read_csv, booleans with missing values stay objects
+        dtype = object if missing.any() else bool
+    else:
+        try:
+            parsed = pd.to_numeric(present)
+        except (ValueError, TypeError):
+            return column.where(~missing, np.nan) if missing.any() else column
+        dtype = np.float64 if missing.any() else parsed.dtype
+
+    values = np.empty(len(uniques), dtype=dtype)
+    values[present.index] = parsed.to_numpy()
+    result = values[codes]
+    if missing.any():
+        result[missing] = np.nan
+    return pd.Series(result, index=column.index, name=column.name)
+
+
+def _csv_column(column: pd.Series) -> pd.Series:
+    # Values as read_csv infers them from their text
+    if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+        return column
+    if pd.api.types.infer_dtype(column, skipna=True) == "string":
+        return _csv_text_column(column)
+    values = column.astype(object)
+    missing = values.isna()
+    text = values.where(missing, values.astype(str))
+    missing |= text.isin(CSV_NA_VALUES)
+    text = text.where(~missing, np.nan)
+    present = text[~missing]
+    if present.empty:
+        return text.astype(np.float64)
+    if present.isin(CSV_BOOLEANS).all():
+        flags = text.map(CSV_BOOLEANS)
+        return flags if missing.any() else flags.astype(bool)
+    try:
+        return pd.to_numeric(text)
+    except (ValueError, TypeError):
+        return text
+
+
+def _csv_dtypes(data: pd.DataFrame) -> pd.DataFrame:
+    # Parquet files are written with the dtypes a CSV round trip gives, so
+    # the stages see the same frames in either format
+    return pd.DataFrame(
+        {column: _csv_column(data[column]) for column in data.columns},
+        columns=data.columns,
+    )
+
+
+def as_loaded(data: pd.DataFrame) -> pd.DataFrame:
+    """`data` as load_data would return it after save_data, without the file.
+
+    Lets stages hand frames over in memory and still see the index and
+    dtypes they get from the DVC outputs: a fresh RangeIndex, and numbers,
+    booleans and missing markers parsed back from text.
+    """
+    return _csv_dtypes(data.reset_index(drop=True))
+
+
 def load_params(params_filepath: str, section: str, logger: logging) -> dict:
     try:
         logger.debug("Getting Params")
@@ -60,7 +215,215 @@ def save_data(
         logger.debug("Saving Data")
         os.makedirs(data_path, exist_ok=True)
 
-        data.to_csv(os.path.join(data_path, file_name), index=False)
+        file_path = os.path.join(data_path, file_name)
+        if file_format(file_path) == "parquet":
+            _csv_dtypes(data).to_parquet(file_path, index=False)
+        else:
+            data.to_csv(file_path, index=False)
         logger.info("Data saved successfully")
     except Exception as e:
         logger.error(f"Error saving data: {e}")
+
+
+def _fingerprint(value, digest) -> None:
+    # Content hash of an argument. Loggers do not change results and are
+    # left out, unknown objects are hashed by their repr
+    if isinstance(value, logging.Logger):
+        digest.update(b"logger")
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        digest.update(repr((type(value), list(frame.columns))).encode())
+        digest.update(repr([str(dtype) for dtype in frame.dtypes]).encode())
+        try:
+            rows = pd.util.hash_pandas_object(value, index=True).to_numpy()
+            digest.update(rows.tobytes())
+        except TypeError:
+            # Unhashable cells, e.g. lists
+            digest.update(pickle.dumps(value))
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=repr):
+            _fingerprint(key, digest)
+            _fingerprint(value[key], digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            _fingerprint(item, digest)
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b"\x1f")
+
+
+def _file_digest(file_path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+@functools.lru_cache(maxsize=8)
+def _memo_switch(params_filepath: str, mtime_ns: int) -> bool:
+    # Parsed once per version of the params file
+    with open(params_filepath, "r") as f:
+        params = yaml.safe_load(f) or {}
+    return bool((params.get("memoize") or {}).get("enabled", False))
+
+
+def memo_enabled() -> bool:
+    # REAL_ESTATE_MEMOIZE=1 or 0 overrides memoize.enabled in params.yaml
+    value = os.environ.get(MEMO_ENV, "")
+    if value:
+        return value != "0"
+    try:
+        return _memo_switch(MEMO_PARAMS, os.stat(MEMO_PARAMS).st_mtime_ns)
+    except (OSError, yaml.YAMLError):
+        return False
+
+
+def _cache_entries(cache_dir: str, prefix: str = "") -> list:
+    # (mtime, size, path) of the entries. Other processes evict concurrently,
+    # entries deleted meanwhile are skipped
+    entries = []
+    names = os.listdir(cache_dir) if os.path.isdir(cache_dir) else []
+    for name in names:
+        if name.startswith(prefix) and name.endswith(".pkl"):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _evict(cache_dir: str, max_bytes: int, keep: str) -> int:
+    # Least recently used entries first, until the cache fits
+    entries = [entry for entry in _cache_entries(cache_dir) if entry[2] != keep]
+    try:
+        total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    except FileNotFoundError:
+        total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def memoize(
+    paths=(),
+    path_params=(),
+    sources=(),
+    cache_dir: str = MEMO_CACHE_DIR,
+    max_bytes: int = MEMO_MAX_BYTES,
+):
+    """Cache the results of a function on disk, keyed on its inputs.
+
+    The key hashes the arguments (DataFrames row by row with
+    pd.util.hash_pandas_object), the source files of the function and of
+    `sources`, and the contents of `paths` and of the files named by the
+    `path_params` arguments, i.e. whatever the function reads besides its
+    arguments. Files the function only writes belong in neither, their
+    contents would change the key of the next call. Results are pickled to
+    `cache_dir`, the least recently used are evicted beyond `max_bytes`.
+    Empty DataFrames, the error result of the pipeline functions, are not
+    stored.
+
+    Off unless `memoize.enabled` is set in params.yaml, or the
+    REAL_ESTATE_MEMOIZE environment variable is 1 (runner --memoize sets
+    it; 0 turns it off whatever params.yaml says). Disabled, the function
+    runs uncached. Memoized functions must not have side effects, a hit
+    skips them.
+
+    The wrapper has cache_stats() and cache_clear(), and __wrapped__ runs
+    the function uncached.
+    """
+
+    def decorator(function):
+        signature = inspect.signature(function)
+        code = hashlib.sha256(function.__qualname__.encode())
+        for source in (function, *sources):
+            with open(inspect.getsourcefile(source), "rb") as f:
+                code.update(f.read())
+        code.update(f"{pd.__version__}|{np.__version__}".encode())
+        code = code.digest()
+        stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not memo_enabled():
+                return function(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.sha256(code)
+            for name, value in bound.arguments.items():
+                digest.update(name.encode())
+                _fingerprint(value, digest)
+            for path in [*paths, *(bound.arguments[name] for name in path_params)]:
+                _fingerprint(path, digest)
+                if path is not None and os.path.isfile(path):
+                    digest.update(_file_digest(path))
+
+            entry = os.path.join(
+                cache_dir, f"{function.__name__}-{digest.hexdigest()[:32]}.pkl"
+            )
+            try:
+                with open(entry, "rb") as f:
+                    result = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                stats["hits"] += 1
+                # Marks the entry as recently used, unless it was just evicted
+                try:
+                    os.utime(entry)
+                except FileNotFoundError:
+                    pass
+                return result
+
+            stats["misses"] += 1
+            result = function(*args, **kwargs)
+            if isinstance(result, pd.DataFrame) and result.empty:
+                return result
+
+            os.makedirs(cache_dir, exist_ok=True)
+            # Written aside and renamed, so readers never see a partial file
+            partial = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(partial, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial, entry)
+            stats["evictions"] += _evict(cache_dir, max_bytes, entry)
+            return result
+
+        def cache_stats() -> dict:
+            entries = _cache_entries(cache_dir, f"{function.__name__}-")
+            calls = stats["hits"] + stats["misses"]
+            return {
+                **stats,
+                "hit_rate": stats["hits"] / calls if calls else 0.0,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+            }
+
+        def cache_clear() -> None:
+            for _, _, path in _cache_entries(cache_dir, f"{function.__name__}-"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        wrapper.cache_stats = cache_stats
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
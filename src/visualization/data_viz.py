@@ -41,8 +41,9 @@ def merge_latlong(df: pd.DataFrame) -> pd.DataFrame:
 if __name__ == "__main__":
     try:
         # load data
+        data_format = utils.get_data_format(logger)
         data_path = os.path.join("data", "interim")
-        file_path = os.path.join(data_path, "gurgaon_properties_missing_value_imputation.csv")
+        file_path = os.path.join(data_path, utils.data_file("gurgaon_properties_missing_value_imputation", data_format))
         df = utils.load_data(file_path, logger)
         if df.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
@@ -56,8 +57,9 @@ if __name__ == "__main__":
 
         # Load gurgaon properties
         data_path = os.path.join("data", "interim")
-        file_path = os.path.join(data_path, "gurgaon_properties.csv")
-        df1 = utils.load_data(file_path, logger)
+        file_path = os.path.join(data_path, utils.data_file("gurgaon_properties", data_format))
+        # Only the features text is needed from the raw merge
+        df1 = utils.load_data(file_path, logger, columns=["features"])
         if df1.empty:
             raise ValueError("Data loading failed: Empty DataFrame")
         
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from src.models.recommender.cosine_sim2 import (
+    parse_price_details,
+    parse_price_details_rowwise,
+)
+
+DETAILS = [
+    # Lakh and crore prices, single and ranged areas
+    "{'2 BHK': {'building_type': 'Apartment', 'area': '1,200 sq.ft.', 'price-range': '₹ 85 L - 1.1 Cr'}, "
+    "'3 BHK': {'building_type': 'Apartment', 'area': '1,500 - 1,850 sq.ft.', 'price-range': '₹ 1.4 - 1.9 Cr'}}",
+    "{'1 RK': {'building_type': 'Studio', 'area': '450 sq.ft.', 'price-range': '₹ 22 Lac - 30 Lac'}}",
+    # Missing keys, an empty Land building type and a config that is not kept
+    "{'4 BHK': {'area': '2,400 sq.ft.'}, 'Land': {'building_type': '', 'price-range': '₹ 2 - 3 Cr'}, "
+    "'7 BHK': {'building_type': 'Villa', 'area': '5,000 sq.ft.', 'price-range': '₹ 9 - 12 Cr'}}",
+    # Malformed ranges and values
+    "{'2 BHK': {'building_type': 'Apartment', 'area': '1,000 - 1,100 - 1,200 sq.ft.', 'price-range': '₹ 90 L'}, "
+    "'3 BHK': {'building_type': 'Apartment', 'area': 'on request', 'price-range': '₹ 1.2 - price on request'}}",
+    "{'5 BHK': {'building_type': 'Villa', 'area': '', 'price-range': '-'}, "
+    "'6 BHK': {'building_type': 'Villa', 'area': 'nan', 'price-range': '₹ 1_000 - 2e3 Cr'}}",
+    # Values float() reads as NaN still make the column numeric
+    "{'Land': {'building_type': 'Plot', 'area': 'nan sq.ft.', 'price-range': '₹ nan - nan L'}}",
+    # Undecodable and missing PriceDetails
+    "{'2 BHK': {'building_type': 'Apartment', 'area': ",
+    "",
+    np.nan,
+    # A repeat, parsed once by the vectorised parser
+    "{'1 RK': {'building_type': 'Studio', 'area': '450 sq.ft.', 'price-range': '₹ 22 Lac - 30 Lac'}}",
+]
+
+
+def test_parse_price_details_matches_rowwise():
+    df_appartments = pd.DataFrame(
+        {
+            "PropertyName": [f"project {i}" for i in range(len(DETAILS))],
+            "PriceDetails": DETAILS,
+        }
+    )
+
+    pd.testing.assert_frame_equal(
+        parse_price_details(df_appartments),
+        parse_price_details_rowwise(df_appartments),
+    )
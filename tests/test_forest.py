@@ -0,0 +1,59 @@
+import numpy as np
+
+import logging
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder
+
+from src.models import forest
+
+logger = logging.getLogger(__name__)
+
+ATOL = 1e-9
+
+
+def _features(n_rows: int, seed: int) -> np.ndarray:
+    # Numeric columns with missing values next to one-hot categories
+    rng = np.random.default_rng(seed)
+    numeric = rng.normal(size=(n_rows, 4))
+    numeric[rng.random(numeric.shape) < 0.15] = np.nan
+    categories = rng.choice(["flat", "house", "plot"], size=(n_rows, 1))
+    one_hot = OneHotEncoder(sparse_output=False).fit_transform(categories)
+    return np.hstack([numeric, one_hot])
+
+
+def test_predict_forest_matches_sklearn():
+    X = _features(500, seed=0)
+    y = (
+        np.nan_to_num(X[:, 0]) * 2
+        + X[:, 4]
+        - np.isnan(X[:, 1])
+        + 0.1 * (np.arange(500) % 3)
+    )
+    model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(
+        X, y
+    )
+    flat = forest.flatten_forest(model, logger)
+
+    X_test = _features(300, seed=1)
+    np.testing.assert_allclose(
+        forest.predict_forest(flat, X_test, block_size=64),
+        model.predict(X_test),
+        rtol=0,
+        atol=ATOL,
+    )
+    assert forest.check_parity(model, flat, X_test, logger, atol=ATOL) <= ATOL
+
+
+def test_predict_forest_roundtrips_through_npz(tmp_path):
+    X = _features(200, seed=2)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 5])
+    file_path = str(tmp_path / "forest.npz")
+    forest.save_forest(forest.flatten_forest(model, logger), file_path, logger)
+
+    np.testing.assert_allclose(
+        forest.predict_forest(forest.load_forest(file_path), X),
+        model.predict(X),
+        rtol=0,
+        atol=ATOL,
+    )
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+import logging
+
+from src.models import predict
+from src.models.model_building import train_model
+from src.models.schema import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PARAMS = {"n_estimators": 5, "max_depth": 4, "max_samples": 1.0, "max_features": 1.0}
+
+
+def _inputs(n_rows: int, balconies: list, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "property_type": rng.choice(["flat", "house"], n_rows),
+            "sector": rng.choice(["sector 1", "sector 2", "sector 3"], n_rows),
+            "bedRoom": rng.integers(1, 5, n_rows).astype(float),
+            "bathroom": rng.integers(1, 5, n_rows).astype(float),
+            "balcony": rng.choice(balconies, n_rows),
+            "agePossession": rng.choice(["New Property", "Old Property"], n_rows),
+            "built_up_area": rng.uniform(500, 3000, n_rows).round(),
+            "servant room": rng.integers(0, 2, n_rows).astype(float),
+            "store room": rng.integers(0, 2, n_rows).astype(float),
+            "furnishing_type": rng.choice(["unfurnished", "furnished"], n_rows),
+            "luxury_category": rng.choice(["Low", "High"], n_rows),
+            "floor_category": rng.choice(["Low Floor", "High Floor"], n_rows),
+        },
+        columns=FEATURE_COLUMNS,
+    )
+
+
+def test_predict_file_pins_chunk_dtypes(tmp_path):
+    train = _inputs(200, ["0", "1", "2", "3+"], seed=0)
+    train["price"] = np.random.default_rng(1).uniform(0.5, 5, len(train))
+    pipeline = train_model(train, PARAMS, str(tmp_path))
+
+    # The first chunk has no '3+', read on its own its balcony is numeric
+    rows = pd.concat(
+        [_inputs(100, ["0", "1", "2"], seed=2), _inputs(100, ["2", "3+"], seed=3)],
+        ignore_index=True,
+    )
+    input_path = tmp_path / "inputs.csv"
+    rows.to_csv(input_path, index=False)
+    output_path = tmp_path / "prices.csv"
+
+    n_rows = predict.predict_file(
+        str(input_path),
+        str(output_path),
+        str(tmp_path / "real_estate_predictor.pkl"),
+        logger,
+        chunk_size=100,
+    )
+
+    assert n_rows == len(rows)
+    prices = pd.read_csv(output_path)
+    expected = np.expm1(pipeline.predict(rows))
+    np.testing.assert_allclose(prices["price"], expected)
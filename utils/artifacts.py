@@ -0,0 +1,144 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+import os
+import sys
+import time
+import pickle
+import threading
+
+import yaml
+from scipy import sparse
+
+# Streamlit reruns page scripts on every interaction but keeps imported
+# modules, so this cache lives for the whole server process
+_cache = {}
+# Guards _cache and _key_locks only, loads hold the lock of their own path
+_lock = threading.Lock()
+_key_locks = {}
+
+
+def _signature(path):
+    """Identify the file version DVC last wrote"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _memory_bytes(obj):
+    """Rough private memory held by a loaded artifact, None if unknown"""
+    if isinstance(obj, np.memmap):
+        # Pages are shared with the OS file cache
+        return 0
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum())
+    if sparse.issparse(obj):
+        return obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes
+    if hasattr(obj, "factors"):
+        # FactorSimilarity keeps the factors and their transpose
+        return _memory_bytes(obj.factors)
+    if isinstance(obj, (dict, list, tuple)):
+        values = obj.values() if isinstance(obj, dict) else obj
+        sizes = [_memory_bytes(value) for value in values]
+        return None if None in sizes else sum(sizes)
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    return None
+
+
+def load_artifact(path, loader, watch=None):
+    """Load an artifact once per process, reloading it when its file changes
+
+    `watch` is the file whose mtime and size key the cache, for artifacts
+    spread over a directory (defaults to `path`).
+    """
+    signature = _signature(watch or path)
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry["signature"] == signature:
+            entry["hits"] += 1
+            return entry["value"]
+        key_lock = _key_locks.setdefault(path, threading.Lock())
+
+    # One load per path at a time, while other artifacts stay available
+    with key_lock:
+        with _lock:
+            entry = _cache.get(path)
+            if entry is not None and entry["signature"] == signature:
+                entry["hits"] += 1
+                return entry["value"]
+
+        start = time.perf_counter()
+        value = loader(path)
+        load_seconds = time.perf_counter() - start
+
+        # Fall back to the size on disk for opaque objects like the pipeline
+        memory_bytes = _memory_bytes(value)
+        if memory_bytes is None:
+            memory_bytes = signature[1]
+
+        with _lock:
+            entry = _cache.get(path)
+            _cache[path] = {
+                "signature": signature,
+                "value": value,
+                "load_seconds": load_seconds,
+                "memory_bytes": memory_bytes,
+                "loads": (entry["loads"] if entry else 0) + 1,
+                "hits": entry["hits"] if entry else 0,
+            }
+        return value
+
+
+def read_pickle(path):
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def load_pickle(path):
+    return load_artifact(path, read_pickle)
+
+
+def load_csv(path):
+    return load_artifact(path, pd.read_csv)
+
+
+def read_yaml(path):
+    with open(path, "r") as file:
+        return yaml.safe_load(file) or {}
+
+
+def load_params(section, path="params.yaml"):
+    """A section of params.yaml, reloaded when the file changes"""
+    return load_artifact(path, read_yaml).get(section, {})
+
+
+def artifact_stats():
+    """Load time, memory and hit counts for every cached artifact"""
+    with _lock:
+        rows = [
+            {
+                "artifact": path,
+                "loads": entry["loads"],
+                "hits": entry["hits"],
+                "load_ms": round(entry["load_seconds"] * 1000, 2),
+                "memory_mb": round(entry["memory_bytes"] / 2**20, 2),
+            }
+            for path, entry in _cache.items()
+        ]
+    return pd.DataFrame(
+        rows, columns=["artifact", "loads", "hits", "load_ms", "memory_mb"]
+    )
+
+
+def show_artifact_stats():
+    """Render the artifact cache metrics in the sidebar"""
+    with st.sidebar.expander("Artifact cache"):
+        stats = artifact_stats()
+        saved = (stats["hits"] * stats["load_ms"]).sum() / 1000
+        st.caption(
+            f"{stats['hits'].sum()} cached loads, ~{saved:.2f}s of loading saved"
+        )
+        st.dataframe(stats, hide_index=True)